@@ -0,0 +1,51 @@
+"""
+Small helpers shared by the benchmark scripts: percentiles, latency summaries and memory readings
+"""
+
+import os
+import resource
+import sys
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies):
+    """Count, mean and p50/p90/p99/max of a list of latencies in seconds"""
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "mean": sum(latencies) / len(latencies),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies)
+    }
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def children_rss_mb():
+    """Current resident memory of this process's children in MB (Linux only, else None)"""
+    total_kb = 0
+    try:
+        for task in os.listdir(f"/proc/{os.getpid()}/task"):
+            with open(f"/proc/{os.getpid()}/task/{task}/children") as f:
+                for pid in f.read().split():
+                    with open(f"/proc/{pid}/status") as status:
+                        for line in status:
+                            if line.startswith("VmRSS:"):
+                                total_kb += int(line.split()[1])
+    except OSError:
+        return None
+    return total_kb / 1024
@@ -0,0 +1,167 @@
+"""
+Paper store benchmark at scale: memory of loaded papers and latency of the reads resources make
+Fills each backend (sqlite, json, columnar) with --papers generated papers spread over --topics topics,
+then measures papers://folders counts (cold and warm), topic pages with and without summaries, and
+the memory taken by every paper held as plain dicts versus PaperRecords with and without summaries.
+
+usage: python benchmarks/bench_store.py --papers 100000 --topics 20 --output store.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from bench_stats import summarize
+# Importing run_benchmarks puts the repository on sys.path
+from run_benchmarks import git_commit
+
+from paper_store import ColumnarPaperStore, JsonPaperStore, SqlitePaperStore
+from search_index import BM25Index
+
+BACKENDS = {"sqlite": SqlitePaperStore, "json": JsonPaperStore, "columnar": ColumnarPaperStore}
+TITLE_FIELDS = ("title", "entry_id")
+
+
+def generate_papers(count, topics, authors_pool, seed=0):
+    """topic -> papers shaped like search_papers results, with arXiv-sized summaries"""
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(5000)]
+    authors = [f"Author {i} Surname{i % 997}" for i in range(authors_pool)]
+    papers = {f"topic_{t}": [] for t in range(topics)}
+    names = list(papers)
+    for i in range(count):
+        papers[names[i % topics]].append({
+            "title": " ".join(rng.choices(words, k=10)),
+            "authors": rng.sample(authors, rng.randint(2, 8)),
+            "summary": " ".join(rng.choices(words, k=rng.randint(120, 220))),
+            "pdf_url": f"http://arxiv.org/pdf/{2400 + i // 100000}.{i % 100000:05d}v1",
+            "published": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "entry_id": f"http://arxiv.org/abs/{2400 + i // 100000}.{i % 100000:05d}v1"
+        })
+    return papers
+
+
+def timed(call, latencies):
+    started = time.perf_counter()
+    result = call()
+    latencies.append(time.perf_counter() - started)
+    return result
+
+
+def held_memory_mb(load):
+    """Memory still allocated by what load() returns, in MB"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = load()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return (after - before) / (1024 * 1024)
+
+
+def bench_backend(name, papers, args, workdir):
+    paper_dir = os.path.join(workdir, name)
+    store = BACKENDS[name](paper_dir)
+    started = time.perf_counter()
+    for topic, topic_papers in papers.items():
+        # Batches the size of a big search
+        for i in range(0, len(topic_papers), args.batch):
+            store.add_papers(topic, topic_papers[i:i + args.batch])
+    write_seconds = time.perf_counter() - started
+    disk_mb = sum(
+        os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(paper_dir) for f in files
+    ) / (1024 * 1024)
+
+    # A fresh store object is a freshly started server: nothing cached in memory yet
+    store = BACKENDS[name](paper_dir)
+    results = {"write_seconds": write_seconds, "disk_mb": disk_mb}
+    cold = []
+    timed(store.topic_counts, cold)
+    warm = []
+    for _ in range(args.reads):
+        timed(lambda: store.topic_counts() if store.catalog_version() else None, warm)
+    results["folders_cold"] = summarize(cold)
+    results["folders_warm"] = summarize(warm)
+
+    rng = random.Random(1)
+    topics = list(papers)
+    for label, fields in (("page_titles", TITLE_FIELDS), ("page_full", None)):
+        latencies = []
+        for _ in range(args.reads):
+            topic = rng.choice(topics)
+            offset = rng.randrange(0, len(papers[topic]), args.page_size)
+            page, _ = timed(lambda: store.get_papers_page(topic, offset, args.page_size, fields=fields), latencies)
+            if fields is None:
+                # Rendering reads every field
+                for paper in page:
+                    paper.summary
+        results[label] = summarize(latencies)
+
+    def load_all(fields):
+        return [store.get_papers_page(t, 0, len(papers[t]), fields=fields)[0] for t in topics]
+
+    results["memory_records_mb"] = held_memory_mb(lambda: load_all(None))
+    results["memory_records_no_summary_mb"] = held_memory_mb(lambda: load_all(TITLE_FIELDS))
+
+    if args.index:
+        index = BM25Index()
+        started = time.perf_counter()
+        index.build(store)
+        results["index_build_seconds"] = time.perf_counter() - started
+    return results
+
+
+def main(args):
+    papers = generate_papers(args.papers, args.topics, args.authors)
+    workdir = tempfile.mkdtemp(prefix="mcp-store-")
+    report = {
+        "meta": {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args)},
+        # The layout every store handed out before records: one dict per paper, as JSON decodes it
+        "memory_dicts_mb": held_memory_mb(
+            lambda: [[json.loads(json.dumps(p)) for p in topic_papers] for topic_papers in papers.values()]
+        ),
+        "backends": {}
+    }
+    try:
+        for name in args.backends:
+            report["backends"][name] = bench_backend(name, papers, args, workdir)
+            print(f"{name}: stored {args.papers} papers in {report['backends'][name]['write_seconds']:.1f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\nall papers as dicts: {report['memory_dicts_mb']:.1f} MB")
+    print(f"{'backend':<10} {'records MB':>10} {'no summ. MB':>11} {'disk MB':>8} {'folders cold':>13} "
+          f"{'warm (ms)':>10} {'titles p50':>11} {'p99':>7} {'full p50':>9} {'p99':>7}")
+    for name, r in report["backends"].items():
+        print(f"{name:<10} {r['memory_records_mb']:>10.1f} {r['memory_records_no_summary_mb']:>11.1f} "
+              f"{r['disk_mb']:>8.1f} {r['folders_cold']['p50'] * 1000:>13.1f} {r['folders_warm']['p50'] * 1000:>10.2f} "
+              f"{r['page_titles']['p50'] * 1000:>11.2f} {r['page_titles']['p99'] * 1000:>7.2f} "
+              f"{r['page_full']['p50'] * 1000:>9.2f} {r['page_full']['p99'] * 1000:>7.2f}")
+    for name, r in report["backends"].items():
+        if "index_build_seconds" in r:
+            print(f"{name}: search_local index built in {r['index_build_seconds']:.1f}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=100000)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--authors", type=int, default=20000, help="Distinct author names papers draw from")
+    parser.add_argument("--batch", type=int, default=1000, help="Papers per add_papers call")
+    parser.add_argument("--reads", type=int, default=200, help="Timed reads per measurement")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--index", action="store_true", help="Also time building the search_local index")
+    parser.add_argument("--output", help="Write the JSON report here")
+    main(parser.parse_args())
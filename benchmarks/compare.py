@@ -0,0 +1,49 @@
+"""
+Compare two JSON reports from run_benchmarks.py
+usage: python benchmarks/compare.py base.json new.json [--threshold 10]
+Exits with status 1 if any phase's p50 or p99 got slower by more than the threshold percentage.
+"""
+
+import argparse
+import json
+import sys
+
+
+def main(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"base {base['meta']['commit']} ({base['meta']['timestamp']}) vs "
+          f"new {new['meta']['commit']} ({new['meta']['timestamp']})")
+    print(f"{'phase':<18} {'metric':>6} {'base (ms)':>10} {'new (ms)':>10} {'change':>8}")
+
+    regressions = 0
+    for phase, stats in new["phases"].items():
+        base_stats = base["phases"].get(phase)
+        if not base_stats or not base_stats.get("count") or not stats.get("count"):
+            continue
+        for metric in ("p50", "p99"):
+            before, after = base_stats[metric], stats[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            flag = ""
+            if change > args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{phase:<18} {metric:>6} {before * 1000:>10.1f} {after * 1000:>10.1f} {change:>+7.1f}%{flag}")
+
+    before = base["throughput"]["queries_per_second"]
+    after = new["throughput"]["queries_per_second"]
+    print(f"throughput: {before:.2f} -> {after:.2f} queries/s")
+    print(f"client peak memory: {base['memory']['client_peak_rss_mb']:.1f} -> "
+          f"{new['memory']['client_peak_rss_mb']:.1f} MB")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+    sys.exit(main(parser.parse_args()))
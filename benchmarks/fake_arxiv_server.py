@@ -0,0 +1,150 @@
+"""
+Fake arXiv API for benchmarks
+Answers GET /api/query with a deterministic Atom feed of made-up papers after a configurable delay,
+and GET /pdf/<id> with a small generated PDF (or <id>.pdf from --pdf-dir) for PDF ingestion.
+Run research_server.py with ARXIV_API_URL=<base_url>/api/query and ARXIV_DELAY_SECONDS=0 to use it.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+from fake_http import FakeHTTPServer
+
+FEED_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <title type="html">ArXiv Query: {query}</title>
+  <id>http://arxiv.org/api/fake</id>
+  <updated>2024-01-01T00:00:00-05:00</updated>
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+  <opensearch:startIndex>{start}</opensearch:startIndex>
+  <opensearch:itemsPerPage>{count}</opensearch:itemsPerPage>
+"""
+
+SAMPLE_SECTIONS = ("Abstract", "1 Introduction", "2 Related Work", "3 Method", "4 Experiments", "5 Conclusion", "References")
+
+
+def sample_pdf(paper_id, lines_per_section=40, lines_per_page=50):
+    """A valid multi-page PDF with one text line per row, using only the standard Helvetica font"""
+    lines = []
+    for section in SAMPLE_SECTIONS:
+        lines.append(section)
+        lines.extend(f"Paper {paper_id}, {section.split(' ', 1)[-1].lower()} sentence {i}: "
+                     "we describe a fake but plausible result in some detail." for i in range(lines_per_section))
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_lines in pages:
+        text = "".join(
+            "({}) Tj T*\n".format(line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)"))
+            for line in page_lines
+        )
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td\n{text}ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+ENTRY = """  <entry>
+    <id>http://arxiv.org/abs/{paper_id}v1</id>
+    <updated>2024-01-{day:02d}T00:00:00Z</updated>
+    <published>2024-01-{day:02d}T00:00:00Z</published>
+    <title>{title}</title>
+    <summary>{summary}</summary>
+    <author><name>Ada Example</name></author>
+    <author><name>Alan Sample</name></author>
+    <link href="http://arxiv.org/abs/{paper_id}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="{pdf_base}/pdf/{paper_id}v1" rel="related" type="application/pdf"/>
+    <arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>
+"""
+
+
+class FakeArxivServer(FakeHTTPServer):
+    def __init__(self, host="127.0.0.1", port=0, latency=0.3, total_results=1000, summary_words=150,
+                 pdf_dir=None):
+        super().__init__(host, port)
+        self.latency = latency
+        self.total_results = total_results
+        self.summary_words = summary_words
+        self.pdf_dir = pdf_dir
+        self.pdf_requests = 0
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/api/query"
+
+    async def handle(self, method, path, headers, body, writer):
+        url = urlsplit(path)
+        if method == "GET" and url.path.startswith("/pdf/"):
+            self.write(writer, 200, self.pdf(url.path[len("/pdf/"):]), content_type="application/pdf")
+            return
+        if method != "GET" or not url.path.endswith("/api/query"):
+            self.write(writer, 404, "not found", content_type="text/plain")
+            return
+        await asyncio.sleep(self.latency)
+        params = parse_qs(url.query)
+        query = params.get("search_query", [""])[0]
+        start = int(params.get("start", ["0"])[0])
+        count = max(0, min(int(params.get("max_results", ["10"])[0]), self.total_results - start))
+        self.write(writer, 200, self.feed(query, start, count), content_type="application/atom+xml")
+
+    def pdf(self, paper_id):
+        self.pdf_requests += 1
+        if self.pdf_dir:
+            path = os.path.join(self.pdf_dir, os.path.basename(paper_id) + ".pdf")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    return f.read()
+        return sample_pdf(paper_id)
+
+    def feed(self, query, start, count):
+        parts = [FEED_HEADER.format(query=escape(query), total=self.total_results, start=start, count=count)]
+        for index in range(start, start + count):
+            digest = hashlib.sha1(f"{query}:{index}".encode()).hexdigest()
+            paper_id = f"{2400 + index % 12:04d}.{int(digest[:5], 16) % 100000:05d}"
+            words = " ".join(f"{query} finding {digest[i % 40]}" for i in range(self.summary_words // 3))
+            parts.append(ENTRY.format(
+                paper_id=paper_id,
+                pdf_base=self.base_url,
+                day=index % 28 + 1,
+                title=escape(f"Paper {index} on {query}"),
+                summary=escape(words)
+            ))
+        parts.append("</feed>\n")
+        return "".join(parts)
+
+
+async def serve_forever(args):
+    server = FakeArxivServer(host=args.host, port=args.port, latency=args.latency, pdf_dir=args.pdf_dir)
+    await server.start()
+    print(f"Fake arXiv API listening on {server.api_url} (latency {args.latency}s)")
+    print(f"Point the research server at it with ARXIV_API_URL={server.api_url} ARXIV_DELAY_SECONDS=0")
+    await server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds to wait before answering")
+    parser.add_argument("--pdf-dir", help="Serve <id>.pdf files from here instead of generated PDFs")
+    asyncio.run(serve_forever(parser.parse_args()))
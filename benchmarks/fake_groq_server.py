@@ -0,0 +1,146 @@
+"""
+Fake Groq (OpenAI-compatible) completion server for load tests and benchmarks
+Answers POST /openai/v1/chat/completions after a configurable delay (streamed as SSE
+when the request asks for it), using only the stdlib. With tool_rounds > 0 it plays
+a scripted agent: it calls a tool that many times per question before answering.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fake_http import FakeHTTPServer
+
+
+class FakeGroqServer(FakeHTTPServer):
+    def __init__(self, host="127.0.0.1", port=0, latency=0.5, reply="This is a fake completion.",
+                 token_interval=0.0, tool_rounds=0, tool_calls=1, tool_name="search_papers",
+                 max_results=5):
+        super().__init__(host, port)
+        # Non-streaming: total delay. Streaming: delay before the first token.
+        self.latency = latency
+        self.token_interval = token_interval
+        self.reply = reply
+        # Scripted tool use: rounds of tool calls per question, calls per round
+        self.tool_rounds = tool_rounds
+        self.tool_calls = tool_calls
+        self.tool_name = tool_name
+        self.max_results = max_results
+        self.completions = 0
+
+    async def handle(self, method, path, headers, body, writer):
+        if method == "POST" and path.endswith("/chat/completions"):
+            await self._complete(writer, json.loads(body or b"{}"))
+        else:
+            self.write(writer, 404, {"error": {"message": f"Unknown path {path}"}})
+
+    def _script(self, request):
+        """Tool calls for this step of the script, or None to answer"""
+        messages = request.get("messages", [])
+        if not request.get("tools") or not self.tool_rounds:
+            return None
+        last_user = max((i for i, m in enumerate(messages) if m["role"] == "user"), default=-1)
+        rounds_done = sum(1 for m in messages[last_user + 1:] if m["role"] == "assistant" and m.get("tool_calls"))
+        if rounds_done >= self.tool_rounds:
+            return None
+
+        # "find papers about X" -> search X
+        query = str(messages[last_user]["content"]) if last_user >= 0 else "papers"
+        topic = query.split(" about ", 1)[-1].strip()
+        return [
+            {
+                "id": f"call_{self.completions}_{j}",
+                "type": "function",
+                "function": {
+                    "name": self.tool_name,
+                    "arguments": json.dumps({
+                        "topic": topic if self.tool_calls == 1 else f"{topic} {j}",
+                        "max_results": self.max_results
+                    })
+                }
+            }
+            for j in range(self.tool_calls)
+        ]
+
+    async def _complete(self, writer, request):
+        self.completions += 1
+        await asyncio.sleep(self.latency)
+        tool_calls = self._script(request)
+        if request.get("stream"):
+            await self._stream(writer, request, tool_calls)
+            return
+        prompt_tokens = sum(len(str(m.get("content") or "").split()) for m in request.get("messages", []))
+        completion_tokens = len(self.reply.split())
+        message = {"role": "assistant", "content": None if tool_calls else self.reply}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        self.write(writer, 200, {
+            "id": f"chatcmpl-fake-{self.completions}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_calls else "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+    async def _stream(self, writer, request, tool_calls):
+        self.start_chunked(writer)
+        chunk_id = f"chatcmpl-fake-{self.completions}"
+        if tool_calls:
+            for j, tool_call in enumerate(tool_calls):
+                self._write_event(writer, self._chunk(chunk_id, request, {"tool_calls": [dict(tool_call, index=j)]}, None))
+            self._write_event(writer, self._chunk(chunk_id, request, {}, "tool_calls"))
+        else:
+            tokens = [word + " " for word in self.reply.split()]
+            tokens[-1] = tokens[-1].rstrip()
+            for i, token in enumerate(tokens):
+                if i and self.token_interval:
+                    await asyncio.sleep(self.token_interval)
+                self._write_event(writer, self._chunk(chunk_id, request, {"content": token}, None))
+                await writer.drain()
+            self._write_event(writer, self._chunk(chunk_id, request, {}, "stop"))
+        self._write_event(writer, "[DONE]")
+        self.end_chunked(writer)
+
+    def _chunk(self, chunk_id, request, delta, finish_reason):
+        return {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+
+    def _write_event(self, writer, payload):
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        self.write_chunk(writer, f"data: {data}\n\n")
+
+
+async def serve_forever(args):
+    server = FakeGroqServer(host=args.host, port=args.port, latency=args.latency,
+                            token_interval=args.token_interval, tool_rounds=args.tool_rounds,
+                            tool_calls=args.tool_calls)
+    await server.start()
+    print(f"Fake Groq server listening on {server.base_url} (latency {args.latency}s)")
+    print(f"Point the chatbot at it with GROQ_BASE_URL={server.base_url}")
+    await server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to wait before answering")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="Seconds between streamed tokens")
+    parser.add_argument("--tool-rounds", type=int, default=0, help="Rounds of tool calls before answering")
+    parser.add_argument("--tool-calls", type=int, default=1, help="Tool calls per round")
+    asyncio.run(serve_forever(parser.parse_args()))
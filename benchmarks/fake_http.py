@@ -0,0 +1,109 @@
+"""
+Minimal keep-alive HTTP/1.1 server on asyncio streams, shared by the fake backends
+Subclasses implement handle(method, path, headers, body, writer)
+"""
+
+import asyncio
+import json
+import threading
+
+
+class FakeHTTPServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.server = None
+        self.loop = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        """Start listening; port 0 picks a free port"""
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def start_in_thread(self):
+        """Run the server on its own event loop so it does not share the client's loop"""
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.start())
+            ready.set()
+            self.loop.run_forever()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        ready.wait()
+        return self
+
+    async def _handle(self, reader, writer):
+        # Keep-alive loop: clients reuse connections
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, value = line.decode().split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+
+                self.requests += 1
+                await self.handle(method, path, headers, body, writer)
+                await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, method, path, headers, body, writer):
+        raise NotImplementedError
+
+    def write(self, writer, status, body, content_type="application/json", extra_headers=None):
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode()
+        reason = "OK" if status == 200 else "Error"
+        headers = "".join(f"{key}: {value}\r\n" for key, value in (extra_headers or {}).items())
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"{headers}"
+            f"Connection: keep-alive\r\n\r\n".encode() + body
+        )
+
+    def start_chunked(self, writer, content_type="text/event-stream"):
+        writer.write(
+            f"HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Transfer-Encoding: chunked\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode()
+        )
+
+    def write_chunk(self, writer, data):
+        if isinstance(data, str):
+            data = data.encode()
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def end_chunked(self, writer):
+        writer.write(b"0\r\n\r\n")
@@ -0,0 +1,81 @@
+"""
+Load test for MCP_ChatBot.process_query against the fake Groq server
+Reports p50/p99 latency per concurrency level; usage: python benchmarks/load_llm.py --sessions 1 10 50
+With --stream it also reports time to first token of the streamed answer
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stats import percentile
+from fake_groq_server import FakeGroqServer
+
+
+async def run_session(chatbot, queries, latencies, first_tokens, stream):
+    for i in range(queries):
+        started = time.perf_counter()
+        first_token = []
+
+        async def on_token(token):
+            if not first_token:
+                first_token.append(time.perf_counter() - started)
+
+        await chatbot.process_query(f"find papers about topic {i}", on_token=on_token if stream else None)
+        latencies.append(time.perf_counter() - started)
+        first_tokens.extend(first_token)
+
+
+async def run_level(sessions, queries, stream):
+    from mcp_chatbot import MCP_ChatBot
+
+    # No MCP servers: every query is a single completion, so we measure only the LLM path
+    chatbots = [MCP_ChatBot() for _ in range(sessions)]
+    latencies = []
+    first_tokens = []
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(c, queries, latencies, first_tokens, stream) for c in chatbots))
+    elapsed = time.perf_counter() - started
+    return {
+        "sessions": sessions,
+        "requests": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "ttft_p50": percentile(first_tokens, 50) if first_tokens else None,
+        "throughput": len(latencies) / elapsed
+    }
+
+
+async def main(args):
+    reply = " ".join(f"token{i}" for i in range(args.tokens))
+    server = FakeGroqServer(latency=args.latency, reply=reply,
+                            token_interval=args.token_interval).start_in_thread()
+    os.environ["GROQ_API_KEY"] = "fake-key"
+    os.environ["GROQ_BASE_URL"] = server.base_url
+    os.environ["GROQ_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    # Every question must reach Groq, not the local fast path
+    os.environ["INTENT_ROUTER"] = "0"
+
+    print(f"Fake completion latency: {args.latency:.2f}s, concurrency limit: {args.max_concurrency}")
+    print(f"{'sessions':>8} {'requests':>8} {'p50 (s)':>8} {'p99 (s)':>8} {'ttft p50':>8} {'req/s':>8}")
+    for sessions in args.sessions:
+        result = await run_level(sessions, args.queries, args.stream)
+        ttft = f"{result['ttft_p50']:>8.3f}" if result["ttft_p50"] is not None else f"{'-':>8}"
+        print(f"{result['sessions']:>8} {result['requests']:>8} {result['p50']:>8.3f} "
+              f"{result['p99']:>8.3f} {ttft} {result['throughput']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--queries", type=int, default=5, help="Queries per session")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--stream", action="store_true", help="Stream the final answer")
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens per fake answer")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="Seconds between streamed tokens")
+    asyncio.run(main(parser.parse_args()))
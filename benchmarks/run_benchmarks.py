@@ -0,0 +1,235 @@
+"""
+End-to-end benchmark of the chatbot and research server against local stand-ins for Groq and arXiv
+Measures connect_to_servers, papers:// resource reads and process_query under concurrency, then writes
+a JSON report that benchmarks/compare.py can diff between commits.
+
+usage: python benchmarks/run_benchmarks.py --sessions 10 --queries 5 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from bench_stats import children_rss_mb, peak_rss_mb, summarize
+from fake_arxiv_server import FakeArxivServer
+from fake_groq_server import FakeGroqServer
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class BenchStep:
+    """Stands in for a tool call's Chainlit step, timing its first progress update"""
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.started = time.perf_counter()
+        self.input = self.output = None
+        self.updated = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def update(self):
+        if not self.updated:
+            self.updated = True
+            self.timings["first_progress"].append(time.perf_counter() - self.started)
+
+
+def make_bench_chatbot():
+    from mcp_chatbot import MCP_ChatBot
+
+    class BenchChatBot(MCP_ChatBot):
+        """MCP_ChatBot that records phase timings and skips the Chainlit UI"""
+
+        timings = {"llm": [], "tool": [], "first_progress": []}
+
+        async def notify(self, content, author="System"):
+            pass
+
+        def tool_step(self, tool_name, tool_args):
+            return BenchStep(self.timings)
+
+        async def complete_turn(self, messages, on_token=None):
+            started = time.perf_counter()
+            try:
+                return await super().complete_turn(messages, on_token=on_token)
+            finally:
+                self.timings["llm"].append(time.perf_counter() - started)
+
+        async def call_tool(self, tool_call):
+            started = time.perf_counter()
+            try:
+                return await super().call_tool(tool_call)
+            finally:
+                self.timings["tool"].append(time.perf_counter() - started)
+
+    return BenchChatBot
+
+
+async def timed(coro, latencies):
+    started = time.perf_counter()
+    result = await coro
+    latencies.append(time.perf_counter() - started)
+    return result
+
+
+async def bench_connect(BenchChatBot, warm_chats):
+    """Cold connect (empty catalog cache, no running server) then warm connects"""
+    cold = []
+    first = BenchChatBot()
+    await timed(first.connect_to_servers(), cold)
+    # Make sure the server is actually up before measuring warm starts
+    await first.get_resource("papers://folders")
+
+    warm = []
+    chatbots = [BenchChatBot() for _ in range(warm_chats)]
+    for chatbot in chatbots:
+        await timed(chatbot.connect_to_servers(), warm)
+    for chatbot in chatbots:
+        await chatbot.cleanup()
+    return first, {"connect_cold": summarize(cold), "connect_warm": summarize(warm)}
+
+
+async def bench_queries(BenchChatBot, sessions, queries, topics):
+    """sessions chats each asking queries questions, all chats at once"""
+    BenchChatBot.timings = {"llm": [], "tool": [], "first_progress": []}
+    chatbots = [BenchChatBot() for _ in range(sessions)]
+    await asyncio.gather(*(chatbot.connect_to_servers() for chatbot in chatbots))
+
+    latencies = []
+
+    async def run_session(index, chatbot):
+        for i in range(queries):
+            topic = f"topic-{(index * queries + i) % topics}"
+            await timed(chatbot.process_query(f"find papers about {topic}"), latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(i, c) for i, c in enumerate(chatbots)))
+    elapsed = time.perf_counter() - started
+
+    for chatbot in chatbots:
+        await chatbot.cleanup()
+    return {
+        "query": summarize(latencies),
+        "llm_call": summarize(BenchChatBot.timings["llm"]),
+        "tool_call": summarize(BenchChatBot.timings["tool"]),
+        # Only searches big enough to be stored in batches report progress
+        "tool_first_progress": summarize(BenchChatBot.timings["first_progress"])
+    }, {"queries_per_second": len(latencies) / elapsed, "elapsed": elapsed}
+
+
+async def bench_resources(chatbot, reads, topics):
+    folders = []
+    topic_pages = []
+    for i in range(reads):
+        await timed(chatbot.get_resource("papers://folders"), folders)
+        await timed(chatbot.get_resource(f"papers://topic-{i % topics}"), topic_pages)
+    return {"resource_folders": summarize(folders), "resource_topic": summarize(topic_pages)}
+
+
+async def main(args):
+    groq = FakeGroqServer(latency=args.llm_latency, tool_rounds=args.tool_rounds,
+                          tool_calls=args.tool_calls, max_results=args.max_results).start_in_thread()
+    arxiv = FakeArxivServer(latency=args.arxiv_latency).start_in_thread()
+
+    os.environ.update({
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_BASE_URL": groq.base_url,
+        "GROQ_MAX_CONCURRENCY": str(args.max_concurrency),
+        # The benchmark questions are simple searches; measure the LLM path unless asked not to
+        "INTENT_ROUTER": "1" if args.intent_router else "0"
+    })
+
+    # Isolated working directory: fresh papers store, catalog cache and server config
+    workdir = tempfile.mkdtemp(prefix="mcp-bench-")
+    with open(os.path.join(workdir, "server_config.json"), "w") as f:
+        json.dump({"mcpServers": {"research": {
+            "command": sys.executable,
+            "args": [os.path.join(REPO_DIR, "research_server.py")],
+            "env": {"ARXIV_API_URL": arxiv.api_url, "ARXIV_DELAY_SECONDS": "0"},
+            "replicas": args.replicas
+        }}}, f)
+    os.chdir(workdir)
+
+    from server_pool import get_server_pool
+
+    BenchChatBot = make_bench_chatbot()
+    phases = {}
+    first, connect_phases = await bench_connect(BenchChatBot, args.warm_chats)
+    phases.update(connect_phases)
+    query_phases, throughput = await bench_queries(BenchChatBot, args.sessions, args.queries, args.topics)
+    phases.update(query_phases)
+    phases.update(await bench_resources(first, args.resource_reads, args.topics))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "args": vars(args)
+        },
+        "phases": phases,
+        "throughput": dict(throughput, groq_completions=groq.completions, arxiv_requests=arxiv.requests),
+        "memory": {"client_peak_rss_mb": peak_rss_mb(), "servers_rss_mb": children_rss_mb()}
+    }
+
+    await first.cleanup()
+    await get_server_pool().close()
+
+    print(f"{'phase':<18} {'count':>6} {'p50 (ms)':>10} {'p90 (ms)':>10} {'p99 (ms)':>10}")
+    for name, stats in phases.items():
+        if stats["count"]:
+            print(f"{name:<18} {stats['count']:>6} {stats['p50'] * 1000:>10.1f} "
+                  f"{stats['p90'] * 1000:>10.1f} {stats['p99'] * 1000:>10.1f}")
+    print(f"throughput: {throughput['queries_per_second']:.2f} queries/s, "
+          f"{groq.completions} Groq completions, {arxiv.requests} arXiv requests")
+    print(f"memory: client peak {report['memory']['client_peak_rss_mb']:.1f} MB, "
+          f"servers {report['memory']['servers_rss_mb']} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent chat sessions")
+    parser.add_argument("--queries", type=int, default=5, help="Questions per session")
+    parser.add_argument("--topics", type=int, default=5, help="Distinct topics the questions cycle through")
+    parser.add_argument("--warm-chats", type=int, default=10, help="Chats started after the first one")
+    parser.add_argument("--resource-reads", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--arxiv-latency", type=float, default=0.3)
+    parser.add_argument("--tool-rounds", type=int, default=1, help="Rounds of tool calls per question")
+    parser.add_argument("--tool-calls", type=int, default=1, help="Tool calls per round")
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--replicas", type=int, default=1, help="research_server replicas")
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--intent-router", action="store_true",
+                        help="Let simple questions skip Groq, to measure what the fast path saves")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+    asyncio.run(main(args))
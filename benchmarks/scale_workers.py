@@ -0,0 +1,160 @@
+"""
+Throughput scaling with the number of chatbot worker processes
+Starts one research_server.py on streamable HTTP, shared by every worker (or with --transport stdio,
+one private stdio server per worker), and local stand-ins for Groq and arXiv. For each worker count it
+runs that many chatbot processes at once, each with --sessions concurrent chats asking --queries
+questions, and reports aggregate queries per second and latency percentiles.
+
+usage: python benchmarks/scale_workers.py --workers 1 2 4 8 --sessions 10 --queries 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_stats import summarize
+from fake_arxiv_server import FakeArxivServer
+from fake_groq_server import FakeGroqServer
+from run_benchmarks import REPO_DIR, git_commit, make_bench_chatbot, timed
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"research server did not start listening on port {port}")
+
+
+async def run_worker(args):
+    """One chatbot process: connect its chats, then time their questions"""
+    from server_pool import get_server_pool
+
+    BenchChatBot = make_bench_chatbot()
+    chatbots = [BenchChatBot() for _ in range(args.sessions)]
+    await asyncio.gather(*(chatbot.connect_to_servers() for chatbot in chatbots))
+    # Make sure the servers are up, so only questions are timed
+    await chatbots[0].get_resource("papers://folders")
+
+    latencies = []
+
+    async def run_session(index, chatbot):
+        for i in range(args.queries):
+            topic = f"topic-{(index * args.queries + i) % args.topics}"
+            await timed(chatbot.process_query(f"find papers about {topic}"), latencies)
+
+    started = time.time()
+    await asyncio.gather(*(run_session(i, c) for i, c in enumerate(chatbots)))
+    finished = time.time()
+
+    for chatbot in chatbots:
+        await chatbot.cleanup()
+    await get_server_pool().close()
+    print(json.dumps({"started": started, "finished": finished, "latencies": latencies}))
+
+
+def run_level(workers, args, workdir, env):
+    """Run workers chatbot processes at once and combine their results"""
+    command = [sys.executable, os.path.abspath(__file__), "--worker",
+               "--sessions", str(args.sessions), "--queries", str(args.queries), "--topics", str(args.topics)]
+    processes = [
+        subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    results = []
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"worker exited with status {process.returncode}")
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    latencies = [latency for result in results for latency in result["latencies"]]
+    elapsed = max(r["finished"] for r in results) - min(r["started"] for r in results)
+    return dict(summarize(latencies), workers=workers, elapsed=elapsed,
+                queries_per_second=len(latencies) / elapsed)
+
+
+def main(args):
+    groq = FakeGroqServer(latency=args.llm_latency, tool_rounds=1).start_in_thread()
+    arxiv = FakeArxivServer(latency=args.arxiv_latency).start_in_thread()
+
+    workdir = tempfile.mkdtemp(prefix="mcp-scale-")
+    server_env = {"ARXIV_API_URL": arxiv.api_url, "ARXIV_DELAY_SECONDS": "0"}
+    env = dict(os.environ, GROQ_API_KEY="fake-key", GROQ_BASE_URL=groq.base_url, INTENT_ROUTER="0",
+               PYTHONPATH=os.pathsep.join([REPO_DIR, os.path.dirname(os.path.abspath(__file__))]))
+
+    server = None
+    if args.transport == "stdio":
+        entry = {"command": sys.executable, "args": [os.path.join(REPO_DIR, "research_server.py")],
+                 "env": server_env}
+    else:
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_DIR, "research_server.py"),
+             "--transport", args.transport, "--port", str(port)],
+            cwd=workdir, env=dict(os.environ, **server_env)
+        )
+        wait_for_port(port)
+        path = "/sse" if args.transport == "sse" else "/mcp"
+        entry = {"url": f"http://127.0.0.1:{port}{path}", "transport": args.transport,
+                 "connections": args.connections}
+    with open(os.path.join(workdir, "server_config.json"), "w") as f:
+        json.dump({"mcpServers": {"research": entry}}, f)
+
+    levels = []
+    try:
+        print(f"{'workers':>8} {'queries':>8} {'q/s':>8} {'speedup':>8} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+        for workers in args.workers:
+            level = run_level(workers, args, workdir, env)
+            levels.append(level)
+            speedup = level["queries_per_second"] / levels[0]["queries_per_second"]
+            print(f"{workers:>8} {level['count']:>8} {level['queries_per_second']:>8.2f} {speedup:>7.2f}x "
+                  f"{level['p50'] * 1000:>10.1f} {level['p99'] * 1000:>10.1f}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print(f"{groq.completions} Groq completions, {arxiv.requests} arXiv requests")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "meta": {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args)},
+                "levels": levels
+            }, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent chats per worker")
+    parser.add_argument("--queries", type=int, default=3, help="Questions per chat")
+    parser.add_argument("--topics", type=int, default=20, help="Distinct topics the questions cycle through")
+    parser.add_argument("--transport", default="streamable-http", choices=["streamable-http", "sse", "stdio"])
+    parser.add_argument("--connections", type=int, default=2, help="Pooled sessions per worker to the shared server")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--arxiv-latency", type=float, default=0.3)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        asyncio.run(run_worker(args))
+    else:
+        if args.output:
+            args.output = os.path.abspath(args.output)
+        main(args)
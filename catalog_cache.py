@@ -0,0 +1,71 @@
+"""
+On-disk cache of MCP server catalogs (tools, prompts and resources)
+Lets a new chat start from the last known catalog instead of waiting for list_* round-trips
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+CACHE_DIR = os.path.join(".mcp_cache", "catalog")
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def catalog_key(server_name, server_config):
+    """Hash of the config entry plus the mtimes of the server executable and script files
+
+    Editing research_server.py or server_config.json therefore invalidates the cache.
+    Network servers have no local files to watch; their catalogs expire by age instead.
+    """
+    files = {}
+    command = server_config.get("command")
+    if command:
+        files[command] = _mtime(shutil.which(command) or command)
+    for arg in server_config.get("args", []):
+        if os.path.exists(arg):
+            files[arg] = _mtime(arg)
+
+    payload = json.dumps({"name": server_name, "config": server_config, "files": files}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _cache_path(key):
+    return os.path.join(os.getenv("MCP_CATALOG_DIR", CACHE_DIR), f"{key}.json")
+
+
+def load_catalog(key, max_age=None):
+    """Return the cached catalog for key, or None if missing, unreadable or older than max_age seconds"""
+    path = _cache_path(key)
+    try:
+        if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_catalog(key, catalog):
+    """Write the catalog atomically so concurrent chats never read a partial file"""
+    path = _cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(catalog, f)
+    os.replace(tmp_path, path)
+
+
+def mark_used(key):
+    """Record that a server was actually used, so later chats warm it up eagerly"""
+    catalog = load_catalog(key)
+    if catalog is not None and not catalog.get("used"):
+        catalog["used"] = True
+        save_catalog(key, catalog)
@@ -0,0 +1,173 @@
+"""
+Optional on-disk cache of Groq completions for the MCP Research Assistant
+Repeat questions with the same conversation state are answered without another API call
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(".mcp_cache", "completions.db")
+DEFAULT_TTL = 24 * 3600.0
+DEFAULT_MAX_ENTRIES = 5000
+# Only deterministic (temperature 0) requests by default: a cached answer to a
+# sampled request would replay one sample forever instead of a fresh one
+DEFAULT_MAX_TEMPERATURE = 0.0
+
+
+def _normalize_text(text):
+    return " ".join(text.split()) if isinstance(text, str) else text
+
+
+def normalize_messages(messages):
+    """Messages with whitespace collapsed, user text lowercased and tool call ids renumbered
+
+    Tool call ids are random per completion, so they are replaced by their order
+    of appearance; otherwise no multi-step conversation would ever match.
+    """
+    ids = {}
+    normalized = []
+    for message in messages:
+        entry = {"role": message["role"], "content": _normalize_text(message.get("content"))}
+        if message["role"] == "user" and entry["content"]:
+            entry["content"] = entry["content"].lower()
+        if message.get("tool_calls"):
+            entry["tool_calls"] = [
+                {
+                    "id": ids.setdefault(tool_call["id"], len(ids)),
+                    "name": tool_call["function"]["name"],
+                    "arguments": json.loads(tool_call["function"]["arguments"] or "{}")
+                }
+                for tool_call in message["tool_calls"]
+            ]
+        if message.get("tool_call_id"):
+            entry["tool_call_id"] = ids.setdefault(message["tool_call_id"], len(ids))
+        normalized.append(entry)
+    return normalized
+
+
+def cache_key(model, temperature, tools, messages):
+    """Hash of model, temperature, tool schemas and normalized messages"""
+    tools_hash = hashlib.sha256(json.dumps(tools or [], sort_keys=True).encode()).hexdigest()
+    payload = json.dumps({
+        "model": model,
+        "temperature": temperature,
+        "tools": tools_hash,
+        "messages": normalize_messages(messages)
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CompletionCache:
+    """SQLite-backed completion cache with TTL and least-recently-used eviction"""
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_temperature=DEFAULT_MAX_TEMPERATURE):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Requests sampled hotter than this are never cached
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions (last_used)")
+        self.conn.commit()
+
+    def cacheable(self, temperature):
+        if temperature is not None and temperature > self.max_temperature:
+            self.bypassed += 1
+            return False
+        return True
+
+    def _get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl:
+                self.conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            return json.loads(value)
+
+    def _put(self, key, value):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            # Evict expired entries, then the least recently used beyond max_entries
+            self.conn.execute("DELETE FROM completions WHERE created_at < ?", (now - self.ttl,))
+            self.conn.execute(
+                """
+                DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+            self.conn.commit()
+
+    async def get(self, key):
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def put(self, key, value):
+        await asyncio.to_thread(self._put, key, value)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+# Process-wide cache shared by every chat session
+_shared_cache = None
+
+
+def get_completion_cache():
+    """Return the shared completion cache, or None unless COMPLETION_CACHE is enabled"""
+    global _shared_cache
+    if os.getenv("COMPLETION_CACHE", "").lower() not in ("1", "true", "yes", "on"):
+        return None
+    if _shared_cache is None:
+        _shared_cache = CompletionCache(
+            path=os.getenv("COMPLETION_CACHE_PATH", DEFAULT_PATH),
+            ttl=float(os.getenv("COMPLETION_CACHE_TTL", DEFAULT_TTL)),
+            max_entries=int(os.getenv("COMPLETION_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+            max_temperature=float(os.getenv("COMPLETION_CACHE_MAX_TEMPERATURE", DEFAULT_MAX_TEMPERATURE))
+        )
+    return _shared_cache
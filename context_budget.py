@@ -0,0 +1,105 @@
+"""
+Token budget for the messages sent to Groq in the process_query loop
+Truncates oversized tool results and collapses tool results the model has already read into short digests
+"""
+
+import json
+
+# Rough token estimate: about four characters per token for English and JSON
+CHARS_PER_TOKEN = 4
+# Fixed cost of the role and separators around every message
+MESSAGE_OVERHEAD = 4
+
+DEFAULT_MAX_PROMPT_TOKENS = 24000
+DEFAULT_MAX_TOOL_RESULT_TOKENS = 4000
+DEFAULT_DIGEST_TOKENS = 200
+
+
+def count_tokens(text):
+    """Estimate the number of tokens in a string"""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_message_tokens(message):
+    """Estimate the tokens of one chat message, including tool call arguments"""
+    tokens = MESSAGE_OVERHEAD + count_tokens(message.get("content"))
+    for tool_call in message.get("tool_calls") or []:
+        tokens += count_tokens(tool_call["function"]["name"]) + count_tokens(tool_call["function"]["arguments"])
+    return tokens
+
+
+def count_messages_tokens(messages):
+    return sum(count_message_tokens(message) for message in messages)
+
+
+def shorten(text, max_tokens, note):
+    """Cut text to about max_tokens, keeping whole JSON list items when the text is a JSON list"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens * CHARS_PER_TOKEN
+
+    try:
+        items = json.loads(text)
+    except (ValueError, TypeError):
+        items = None
+    if isinstance(items, list):
+        kept = []
+        used = 2
+        for item in items:
+            size = len(json.dumps(item)) + 2
+            if used + size > budget:
+                break
+            kept.append(item)
+            used += size
+        if kept:
+            return json.dumps(kept) + f"\n[{note}: showing {len(kept)} of {len(items)} items]"
+
+    return text[:budget] + f"\n[{note}: {count_tokens(text) - max_tokens} more tokens omitted]"
+
+
+class ContextBudget:
+    def __init__(self, max_prompt_tokens=DEFAULT_MAX_PROMPT_TOKENS,
+                 max_tool_result_tokens=DEFAULT_MAX_TOOL_RESULT_TOKENS,
+                 digest_tokens=DEFAULT_DIGEST_TOKENS):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_tool_result_tokens = max_tool_result_tokens
+        self.digest_tokens = digest_tokens
+
+    def digest(self, message):
+        """Short stand-in for a tool result"""
+        return dict(message, content=shorten(message["content"], self.digest_tokens, "digest"))
+
+    def fit(self, messages):
+        """Return a compacted copy of messages that fits the budget
+
+        The full history is left untouched, so every iteration compacts from the originals.
+        """
+        # Tool results followed by an assistant message have already been read by the model
+        last_assistant = max(
+            (i for i, message in enumerate(messages) if message["role"] == "assistant"), default=-1
+        )
+
+        compacted = []
+        for i, message in enumerate(messages):
+            if message["role"] == "tool":
+                if i < last_assistant:
+                    message = self.digest(message)
+                else:
+                    message = dict(message, content=shorten(
+                        message["content"], self.max_tool_result_tokens, "truncated"
+                    ))
+            compacted.append(message)
+
+        # Still too big: digest unread tool results too, oldest first
+        total = count_messages_tokens(compacted)
+        for i, message in enumerate(compacted):
+            if total <= self.max_prompt_tokens:
+                break
+            if message["role"] == "tool":
+                digested = self.digest(message)
+                total -= count_message_tokens(message) - count_message_tokens(digested)
+                compacted[i] = digested
+
+        return compacted
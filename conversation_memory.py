@@ -0,0 +1,163 @@
+"""
+Per-chat conversation memory for the MCP Research Assistant
+Recent turns are kept verbatim, older turns are rolled into a summary, and tool results are kept for reuse
+"""
+
+from collections import OrderedDict
+from context_budget import count_messages_tokens, shorten
+import asyncio
+import json
+
+DEFAULT_WINDOW_TURNS = 6
+DEFAULT_MAX_TOKENS = 6000
+DEFAULT_TOOL_CACHE_SIZE = 50
+# Size of each remembered tool result shown to the model
+TOOL_RESULT_DIGEST_TOKENS = 150
+# Tools whose result for the same arguments stays valid for the rest of the chat. Not search_local
+# (its results grow as papers are stored) or read_paper (it may answer "try again shortly")
+CACHEABLE_TOOLS = frozenset({"search_papers", "search_papers_batch"})
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and a research assistant. "
+    "Keep topics searched, paper titles and IDs mentioned, and any open questions. "
+    "Reply with the updated summary only, in at most 200 words.\n\n"
+    "Current summary:\n{summary}\n\nNew turns:\n{turns}"
+)
+
+
+def tool_cache_key(tool_name, tool_args):
+    return f"{tool_name}:{json.dumps(tool_args, sort_keys=True)}"
+
+
+class ConversationMemory:
+    def __init__(self, summarize=None, window_turns=DEFAULT_WINDOW_TURNS,
+                 max_tokens=DEFAULT_MAX_TOKENS, tool_cache_size=DEFAULT_TOOL_CACHE_SIZE,
+                 cacheable_tools=CACHEABLE_TOOLS):
+        # async summarize(summary, turns) -> str; without it older turns are kept as excerpts
+        self.summarize = summarize
+        self.window_turns = window_turns
+        self.max_tokens = max_tokens
+        self.tool_cache_size = tool_cache_size
+        self.cacheable_tools = cacheable_tools
+        self.summary = ""
+        # Recent (user, assistant) pairs, oldest first
+        self.turns = []
+        # Turns that left the window but are not yet folded into the summary
+        self.pending = []
+        self.summary_task = None
+        # Bumped by clear(), so a fold that was already running drops its result
+        self.generation = 0
+        # "tool:args" -> (tool_name, tool_args, result), least recently used first
+        self.tool_results = OrderedDict()
+
+    def add_turn(self, query, answer):
+        """Remember a finished turn, rolling the oldest ones out of the window"""
+        self.turns.append((query, answer))
+        while len(self.turns) > self.window_turns:
+            self.pending.append(self.turns.pop(0))
+        self._start_summary()
+
+    def _start_summary(self):
+        if not self.pending or not self.summarize:
+            return
+        if self.summary_task and not self.summary_task.done():
+            return
+        self.summary_task = asyncio.create_task(self._fold_pending())
+
+    async def _fold_pending(self):
+        # Summarize in the background so the user never waits on it
+        generation = self.generation
+        while self.pending and generation == self.generation:
+            turns = list(self.pending)
+            try:
+                summary = await self.summarize(self.summary, self._excerpts(turns))
+            except Exception:
+                summary = "\n".join(filter(None, [self.summary, self._excerpts(turns)]))
+            if generation != self.generation:
+                # Cleared while summarizing: these turns are gone already
+                return
+            self.summary = summary
+            del self.pending[:len(turns)]
+
+    @staticmethod
+    def _excerpts(turns):
+        return "\n".join(
+            f"User: {shorten(query, 60, 'cut')}\nAssistant: {shorten(answer, 120, 'cut')}"
+            for query, answer in turns
+        )
+
+    def remember_tool_result(self, tool_name, tool_args, result):
+        if tool_name not in self.cacheable_tools:
+            return
+        key = tool_cache_key(tool_name, tool_args)
+        self.tool_results[key] = (tool_name, tool_args, result)
+        self.tool_results.move_to_end(key)
+        while len(self.tool_results) > self.tool_cache_size:
+            self.tool_results.popitem(last=False)
+
+    def cached_tool_result(self, tool_name, tool_args):
+        """Result of an identical earlier call to a cacheable tool in this chat, or None"""
+        if tool_name not in self.cacheable_tools:
+            return None
+        entry = self.tool_results.get(tool_cache_key(tool_name, tool_args))
+        if entry is None:
+            return None
+        self.tool_results.move_to_end(tool_cache_key(tool_name, tool_args))
+        return entry[2]
+
+    def _system_message(self):
+        parts = []
+        summary = "\n".join(filter(None, [self.summary, self._excerpts(self.pending)]))
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        if self.tool_results:
+            lines = [
+                f"- {tool_name}({json.dumps(tool_args)}) -> {shorten(result, TOOL_RESULT_DIGEST_TOKENS, 'digest')}"
+                for tool_name, tool_args, result in reversed(self.tool_results.values())
+            ]
+            parts.append(
+                "arXiv search results already available in this conversation "
+                "(repeating one of these searches with the same arguments returns the same result instantly; "
+                "other tools are always run again):\n" + "\n".join(lines)
+            )
+        if not parts:
+            return None
+        return {"role": "system", "content": "\n\n".join(parts)}
+
+    def context(self):
+        """Messages that carry the conversation so far, within max_tokens"""
+        while True:
+            messages = []
+            system_message = self._system_message()
+            if system_message:
+                messages.append(system_message)
+            for query, answer in self.turns:
+                messages.append({"role": "user", "content": query})
+                messages.append({"role": "assistant", "content": answer})
+
+            if count_messages_tokens(messages) <= self.max_tokens or not self.turns:
+                break
+            # Over the ceiling: roll the oldest verbatim turn into the summary
+            self.pending.append(self.turns.pop(0))
+            self._start_summary()
+
+        if system_message and count_messages_tokens(messages) > self.max_tokens:
+            # Only the summary and tool results are left; cut them to fit
+            messages[0] = dict(system_message, content=shorten(
+                system_message["content"], max(self.max_tokens - 4, 0), "memory truncated"
+            ))
+        return messages
+
+    def clear(self):
+        self.generation += 1
+        if self.summary_task and not self.summary_task.done():
+            self.summary_task.cancel()
+        self.summary_task = None
+        self.summary = ""
+        self.turns.clear()
+        self.pending.clear()
+        self.tool_results.clear()
+
+
+def summary_prompt(summary, turns):
+    return SUMMARY_PROMPT.format(summary=summary or "(empty)", turns=turns)
@@ -0,0 +1,236 @@
+"""
+Local intent router for the MCP Research Assistant
+Recognizes simple requests (search a topic, list folders, show a topic) so the chatbot can answer them
+without Groq; anything it is not confident about goes to the LLM as before
+
+Goes to the LLM, for example:
+    compare recent work on GNNs and transformers (analysis, not a plain search)
+    search for papers, search for more, search for something new (no real topic)
+    find papers about the second paper, the latest one, or it; show the first folder (refer back to the conversation)
+
+EXAMPLES below lists these with the expected routing; python intent_router.py checks them.
+"""
+
+from collections import Counter
+import os
+import re
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+DEFAULT_MAX_RESULTS = 20
+# search_papers' own default
+DEFAULT_SEARCH_RESULTS = 5
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20, "a few": 3, "some": DEFAULT_SEARCH_RESULTS
+}
+COUNT = r"(?:(?P<count>\d+|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r")\s+)?"
+PAPERS = r"(?:(?:new|recent|latest|arxiv|research)\s+)?(?:papers?|articles?|preprints?)"
+TOPIC = r"(?P<topic>.+?)(?:\s+(?:on|from|in)\s+arxiv)?"
+
+# (intent, pattern, base confidence); patterns match the whole cleaned-up query
+PATTERNS = [
+    ("search_papers", re.compile(
+        rf"^(?:find|search(?:\s+arxiv)?(?:\s+for)?|look\s+(?:up|for)|get|fetch|download)\s+(?:me\s+)?{COUNT}"
+        rf"{PAPERS}\s+(?:about|on|regarding|related\s+to|for|in)\s+{TOPIC}$"), 0.95),
+    ("search_papers", re.compile(rf"^search\s+(?:arxiv\s+)?for\s+{TOPIC}$"), 0.85),
+    ("search_papers", re.compile(rf"^{COUNT}{PAPERS}\s+(?:about|on)\s+{TOPIC}$"), 0.85),
+    ("list_folders", re.compile(
+        r"^(?:list|show(?:\s+me)?|see|what\s+are)\s+(?:all\s+)?(?:the\s+|my\s+|our\s+)?"
+        r"(?:available\s+|saved\s+|stored\s+)?(?:topics|folders|topic\s+folders)"
+        r"(?:\s+(?:do\s+(?:we|i)\s+have|are\s+there|available|saved|stored))?$"), 0.95),
+    ("list_folders", re.compile(
+        r"^(?:what|which)\s+(?:topics|folders)\s+(?:do\s+(?:we|i)\s+have|are\s+(?:there|available|saved|stored))$"), 0.95),
+    ("show_topic", re.compile(
+        r"^(?:show|list|open|view)\s+(?:me\s+)?(?:the\s+)?(?:saved\s+|stored\s+)?papers\s+"
+        r"(?:in|from)\s+(?:the\s+)?(?:topic|folder)\s+(?P<topic>.+)$"), 0.95),
+    ("show_topic", re.compile(
+        r"^(?:show|open|view)\s+(?:me\s+)?(?:the\s+)?(?:topic|folder)\s+(?P<topic>.+)$"), 0.9),
+    ("show_topic", re.compile(
+        r"^(?:show|open|view)\s+(?:me\s+)?(?:the\s+)?(?P<topic>.+?)\s+(?:topic|folder)$"), 0.9),
+]
+
+POLITE_PREFIX = re.compile(r"^(?:(?:please|hey|hi)\s+|(?:can|could|would|will)\s+you\s+(?:please\s+)?)+")
+POLITE_SUFFIX = re.compile(r"\s+(?:please|for me|thanks|thank you)$")
+
+# Words in a "topic" that mean the user wants more than a plain search or listing
+ANALYSIS_WORDS = {
+    "compare", "comparison", "summarize", "summarise", "summary", "explain", "why", "how", "difference",
+    "differences", "versus", "vs", "between", "best", "review", "analyze", "analyse", "trends", "then"
+}
+# Words that point back at the conversation, which only the LLM can resolve
+REFERENCE_WORDS = {
+    "it", "them", "those", "these", "that", "this", "previous", "above", "earlier",
+    "more", "another", "else", "other", "others", "again", "same"
+}
+# "Topics" that name no subject at all
+GENERIC_TOPICS = {
+    "paper", "papers", "article", "articles", "preprint", "preprints", "research", "arxiv",
+    "topic", "topics", "folder", "folders", "something", "anything", "stuff", "one", "ones",
+    "new", "newer", "newest", "latest", "recent", "some", "any", "all", "things"
+}
+ORDINALS = (
+    "first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth|last|latter|former|previous|next"
+)
+# A bare "second" or "last" is a pick from an earlier list, not a topic
+ORDINAL_WORD = re.compile(rf"^(?:{ORDINALS}|\d+(?:st|nd|rd|th))$")
+# The second paper, the latest one, that article, the first folder: something from the conversation
+ORDINAL_REFERENCE = re.compile(
+    rf"\b(?:{ORDINALS}|latest|recent|newest|same|other|above|that|this|those|these|\d+(?:st|nd|rd|th))\s+"
+    r"(?:one|ones|paper|papers|article|articles|result|results|preprint|preprints|topic|topics|folder|folders)\b"
+)
+MAX_TOPIC_WORDS = 8
+
+
+class Intent:
+    """A recognized request: what to do, with which arguments, and how sure the router is"""
+
+    __slots__ = ("name", "confidence", "args")
+
+    def __init__(self, name, confidence, args):
+        self.name = name
+        self.confidence = confidence
+        self.args = args
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, {self.confidence:.2f}, {self.args!r})"
+
+
+def clean_query(query):
+    """Lowercase, collapse spaces and drop punctuation and politeness around the request"""
+    text = " ".join(query.lower().split()).strip(" .!?")
+    text = POLITE_PREFIX.sub("", text)
+    return POLITE_SUFFIX.sub("", text).strip(" .!?")
+
+
+class IntentRouter:
+    def __init__(self, min_confidence=DEFAULT_MIN_CONFIDENCE, max_results=DEFAULT_MAX_RESULTS):
+        self.min_confidence = min_confidence
+        # Larger searches are left to the LLM, which may want to narrow them down
+        self.max_results = max_results
+        # Decision -> count: an intent name for answers given locally, "llm" or "fallback" otherwise
+        self.decisions = Counter()
+        # Groq completions the local answers made unnecessary
+        self.completions_skipped = 0
+
+    def classify(self, query):
+        """Best matching intent with its confidence, even if too low to act on, or None"""
+        text = clean_query(query)
+        best = None
+        for name, pattern, confidence in PATTERNS:
+            match = pattern.match(text)
+            if not match:
+                continue
+            args = {}
+            groups = match.groupdict()
+            if groups.get("topic") is not None:
+                topic = groups["topic"].strip(" \"'`")
+                if not topic or self._not_a_topic(topic):
+                    continue
+                confidence -= self._topic_penalty(topic)
+                args["topic"] = topic
+            if name == "search_papers":
+                count = groups.get("count")
+                args["max_results"] = (
+                    int(count) if count and count.isdigit() else NUMBER_WORDS.get(count, DEFAULT_SEARCH_RESULTS)
+                )
+                if not 0 < args["max_results"] <= self.max_results:
+                    confidence -= 0.5
+            if best is None or confidence > best.confidence:
+                best = Intent(name, round(confidence, 2), args)
+        return best
+
+    def route(self, query):
+        """The intent to answer locally, or None when the LLM should handle the query"""
+        intent = self.classify(query)
+        if intent is None or intent.confidence < self.min_confidence:
+            return None
+        return intent
+
+    @staticmethod
+    def _not_a_topic(topic):
+        """True for generic or referring "topics" that must never start a search"""
+        words = [word for word in re.findall(r"[a-z0-9'-]+", topic) if word not in ("the", "a", "an", "my", "our")]
+        if all(word in GENERIC_TOPICS or word in REFERENCE_WORDS or ORDINAL_WORD.match(word) for word in words):
+            return True
+        return bool(ORDINAL_REFERENCE.search(topic))
+
+    @staticmethod
+    def _topic_penalty(topic):
+        words = re.findall(r"[a-z0-9'-]+", topic)
+        penalty = 0.5 * sum(1 for word in words if word in ANALYSIS_WORDS)
+        penalty += 0.3 * sum(1 for word in words if word in REFERENCE_WORDS)
+        if " and " in f" {topic} " or "," in topic:
+            # Probably several topics: the LLM can search them separately or in one batch
+            penalty += 0.2
+        if len(words) > MAX_TOPIC_WORDS:
+            penalty += 0.3
+        return penalty
+
+    def record(self, decision, completions_skipped=0):
+        self.decisions[decision] += 1
+        self.completions_skipped += completions_skipped
+
+    def stats(self):
+        routed = sum(n for decision, n in self.decisions.items() if decision not in ("llm", "fallback"))
+        return {
+            "answered_locally": routed,
+            "sent_to_llm": self.decisions["llm"],
+            "fell_back": self.decisions["fallback"],
+            "completions_skipped": self.completions_skipped,
+            "by_intent": {d: n for d, n in self.decisions.items() if d not in ("llm", "fallback")}
+        }
+
+
+_shared_router = None
+
+
+def get_intent_router():
+    """Return the shared intent router, or None if INTENT_ROUTER is turned off"""
+    global _shared_router
+    if os.getenv("INTENT_ROUTER", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    if _shared_router is None:
+        _shared_router = IntentRouter(
+            min_confidence=float(os.getenv("INTENT_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE)),
+            max_results=int(os.getenv("INTENT_MAX_RESULTS", DEFAULT_MAX_RESULTS))
+        )
+    return _shared_router
+
+
+# Regression table: (query, intent the router should act on, or None for the LLM)
+EXAMPLES = [
+    ("find 3 papers about transformers", "search_papers"),
+    ("search for papers on graph neural networks", "search_papers"),
+    ("find papers about paper folding", "search_papers"),
+    ("find papers about research ethics", "search_papers"),
+    ("list folders", "list_folders"),
+    ("open the folder machine_learning", "show_topic"),
+    ("search for papers", None),
+    ("find papers about papers", None),
+    ("search for more", None),
+    ("search for something new", None),
+    ("find more papers", None),
+    ("find papers about the second paper", None),
+    ("find papers about the 2nd paper", None),
+    ("find papers about the first one", None),
+    ("find papers about the latest one", None),
+    ("find papers about it", None),
+    ("find papers on that paper", None),
+    ("show me the second topic", None),
+    ("show the first folder", None),
+    ("open the last folder", None),
+    ("compare recent work on GNNs and transformers", None),
+]
+
+
+if __name__ == "__main__":
+    router = IntentRouter()
+    failures = 0
+    for query, expected in EXAMPLES:
+        intent = router.route(query)
+        if (intent.name if intent else None) != expected:
+            failures += 1
+            print(f"FAIL {query!r}: expected {expected}, got {intent!r}")
+    print(f"{len(EXAMPLES) - failures} of {len(EXAMPLES)} examples routed as expected")
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,108 @@
+"""
+Async LLM client for the MCP Research Assistant
+Shares one AsyncGroq connection pool and one fair, rate-limited scheduler across all chat sessions
+"""
+
+from groq import APIConnectionError, AsyncGroq
+from context_budget import count_messages_tokens, count_tokens
+from llm_scheduler import INTERACTIVE, LLMScheduler
+import json
+import os
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_RETRIES = 4
+
+
+def estimate_tokens(request):
+    """Upper bound on the tokens a request can use: prompt, tool schemas and max_tokens"""
+    tokens = count_messages_tokens(request.get("messages", []))
+    if request.get("tools"):
+        tokens += count_tokens(json.dumps(request["tools"]))
+    return tokens + (request.get("max_tokens") or 0)
+
+
+def usage_tokens(usage):
+    return getattr(usage, "total_tokens", None) if usage else None
+
+
+class LLMClient:
+    def __init__(self, api_key, base_url=None, timeout=DEFAULT_TIMEOUT,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES,
+                 requests_per_minute=0, tokens_per_minute=0):
+        # Retries are done by the scheduler, so they respect the shared limits
+        self.client = AsyncGroq(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            max_retries=0
+        )
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.scheduler = LLMScheduler(
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=max_retries,
+            retryable_errors=(APIConnectionError,)
+        )
+
+    @property
+    def in_flight(self):
+        return self.scheduler.in_flight
+
+    async def complete(self, session_id=None, priority=INTERACTIVE, **kwargs):
+        """Create a chat completion without blocking the event loop
+
+        session_id and priority decide this call's place in the shared queue.
+        """
+        response, ticket = await self.scheduler.start(
+            lambda: self.client.chat.completions.create(**kwargs),
+            session=session_id, priority=priority, tokens=estimate_tokens(kwargs)
+        )
+        self.scheduler.release(ticket, used_tokens=usage_tokens(getattr(response, "usage", None)))
+        return response
+
+    async def stream(self, session_id=None, priority=INTERACTIVE, **kwargs):
+        """Yield completion chunks as they arrive, holding a scheduler slot until done"""
+        response, ticket = await self.scheduler.start(
+            lambda: self.client.chat.completions.create(stream=True, **kwargs),
+            session=session_id, priority=priority, tokens=estimate_tokens(kwargs)
+        )
+        used_tokens = None
+        try:
+            async for chunk in response:
+                # Groq reports usage on the last chunk, under x_groq
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                used_tokens = usage_tokens(usage) or used_tokens
+                yield chunk
+        finally:
+            self.scheduler.release(ticket, used_tokens=used_tokens)
+
+    async def close(self):
+        """Close the underlying HTTP connection pool"""
+        await self.client.close()
+
+
+# Process-wide client shared by every chat session
+_shared_client = None
+
+
+def get_llm_client():
+    """Return the shared LLM client, creating it on first use"""
+    global _shared_client
+    if _shared_client is None:
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in .env file")
+        # Limits can be overridden from .env; set the rate limits to your Groq plan's
+        _shared_client = LLMClient(
+            api_key=api_key,
+            base_url=os.getenv("GROQ_BASE_URL"),
+            timeout=float(os.getenv("GROQ_TIMEOUT", DEFAULT_TIMEOUT)),
+            max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+            max_retries=int(os.getenv("GROQ_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            requests_per_minute=int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "0")),
+            tokens_per_minute=int(os.getenv("GROQ_TOKENS_PER_MINUTE", "0"))
+        )
+    return _shared_client
@@ -0,0 +1,241 @@
+"""
+Fair scheduler for LLM calls shared by every chat session in the process
+
+Each completion waits for a slot here before it is sent. A slot needs a free
+concurrency slot, one token from the requests-per-minute bucket and the
+request's estimated size from the tokens-per-minute bucket. Waiting calls are
+served by priority (interactive before background), then round-robin across
+chat sessions, so one busy chat can't starve the others. Rate-limit (429) and
+transient errors are retried with jittered exponential backoff, honoring
+Retry-After; a 429 also pauses every other call until the quota resets.
+"""
+
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from rate_limit import TokenBucket
+from tracing import get_tracer
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# Priorities: lower numbers are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class RateLimitedError(Exception):
+    """Raised when the LLM API still rate limits a call after all retries"""
+
+
+class Ticket:
+    """One call waiting for, or holding, a slot"""
+
+    __slots__ = ("session", "priority", "tokens", "future", "enqueued")
+
+    def __init__(self, session, priority, tokens, future):
+        self.session = session
+        self.priority = priority
+        self.tokens = tokens
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency=16, requests_per_minute=0, tokens_per_minute=0,
+                 max_retries=4, backoff_base=1.0, backoff_max=60.0, retryable_errors=()):
+        self.max_concurrency = max_concurrency
+        # A full minute of quota may be used at once, as the API's per-minute windows allow
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Exception types worth retrying besides retryable HTTP statuses (e.g. connection errors)
+        self.retryable_errors = tuple(retryable_errors)
+        self.tracer = get_tracer()
+        # priority -> session -> waiting tickets; sessions rotate to the back after each grant
+        self.queues = {}
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.timer = None
+        # Recent queue waits in seconds, for stats()
+        self.waits = deque(maxlen=1000)
+        self.granted = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    async def acquire(self, session=None, priority=INTERACTIVE, tokens=0):
+        """Wait for a slot for a call of about ``tokens`` tokens and return its ticket"""
+        ticket = Ticket(session, priority, tokens, asyncio.get_running_loop().create_future())
+        self.queues.setdefault(priority, OrderedDict()).setdefault(session, deque()).append(ticket)
+        with self.tracer.span("llm_wait", priority=priority) as span:
+            self._dispatch()
+            try:
+                await ticket.future
+            except asyncio.CancelledError:
+                if ticket.future.done() and not ticket.future.cancelled():
+                    # Granted just as the caller gave up
+                    self.release(ticket, used_tokens=0)
+                else:
+                    self._remove(ticket)
+                raise
+            wait = time.monotonic() - ticket.enqueued
+            span.set(queued_ms=round(wait * 1000, 1))
+        self.waits.append(wait)
+        return ticket
+
+    def release(self, ticket, used_tokens=None):
+        """Free a ticket's slot; used_tokens corrects the bucket for the call's real size"""
+        self.in_flight -= 1
+        if used_tokens is not None:
+            self.tokens.give_back(ticket.tokens - used_tokens)
+        self._dispatch()
+
+    def _remove(self, ticket):
+        sessions = self.queues.get(ticket.priority, {})
+        waiting = sessions.get(ticket.session)
+        if waiting and ticket in waiting:
+            waiting.remove(ticket)
+            if not waiting:
+                del sessions[ticket.session]
+        self._dispatch()
+
+    def _next(self):
+        """The ticket to serve next: highest priority, then the session that waited longest for a turn"""
+        for priority in sorted(self.queues):
+            sessions = self.queues[priority]
+            if sessions:
+                session, waiting = next(iter(sessions.items()))
+                return sessions, session, waiting
+        return None
+
+    def _dispatch(self):
+        """Grant slots while limits allow, or retry when the next bucket refill is due"""
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        while self.in_flight < self.max_concurrency:
+            head = self._next()
+            if head is None:
+                return
+            sessions, session, waiting = head
+            ticket = waiting[0]
+            delay = max(
+                self.paused_until - time.monotonic(),
+                self.requests.time_until(1),
+                self.tokens.time_until(ticket.tokens)
+            )
+            if delay > 0:
+                self.timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            waiting.popleft()
+            # Round-robin: this session goes to the back of its priority level
+            del sessions[session]
+            if waiting:
+                sessions[session] = waiting
+            self.requests.take(1)
+            self.tokens.take(ticket.tokens)
+            self.in_flight += 1
+            self.granted += 1
+            ticket.future.set_result(None)
+
+    def pause(self, seconds):
+        """Hold back every call for ``seconds``, e.g. after the API said to retry later"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def start(self, call, session=None, priority=INTERACTIVE, tokens=0):
+        """Run call() in a slot, retrying transient failures
+
+        Returns the result and the ticket; the caller releases the ticket when it
+        is done with the result (streams hold their slot until fully read).
+        """
+        attempt = 0
+        while True:
+            ticket = await self.acquire(session, priority, tokens)
+            try:
+                return await call(), ticket
+            except asyncio.CancelledError:
+                self.release(ticket, used_tokens=0)
+                raise
+            except Exception as e:
+                # Failed calls don't consume the token estimate
+                self.release(ticket, used_tokens=0)
+                delay = self.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                if attempt >= self.max_retries:
+                    if getattr(e, "status_code", None) == 429:
+                        raise RateLimitedError(
+                            f"The language model is rate limiting requests; gave up after {attempt + 1} attempts"
+                        ) from e
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.warning("LLM call failed (%s), retry %d in %.1fs", e, attempt, delay)
+                await asyncio.sleep(delay)
+
+    def retry_delay(self, error, attempt):
+        """Seconds to wait before retrying after error, or None if it should not be retried"""
+        status = getattr(error, "status_code", None)
+        if not (isinstance(error, self.retryable_errors) or status in RETRYABLE_STATUS
+                or (status is not None and status >= 500)):
+            return None
+
+        # Exponential backoff with jitter, so retries from many sessions spread out
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        delay = random.uniform(backoff / 2, backoff)
+        retry_after = parse_retry_after(getattr(getattr(error, "response", None), "headers", None))
+        if retry_after is not None:
+            delay = min(self.backoff_max, retry_after) + random.uniform(0, self.backoff_base)
+        if status == 429:
+            self.rate_limited += 1
+            # Everyone is over the same quota: hold back the other calls too
+            self.pause(delay)
+        return delay
+
+    def stats(self):
+        """Queue depth, wait times and rate limit state, for sizing the API quota"""
+        waits = sorted(self.waits)
+        queued = {priority: sum(len(w) for w in sessions.values()) for priority, sessions in self.queues.items()}
+        return {
+            "in_flight": self.in_flight,
+            "queued": sum(queued.values()),
+            "queued_by_priority": {p: n for p, n in queued.items() if n},
+            "sessions_waiting": sum(len(sessions) for sessions in self.queues.values()),
+            "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+            "wait_p99_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 1) if waits else 0.0,
+            "granted": self.granted,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 1),
+            # None when that limit is off
+            "requests_available": round(self.requests.available(), 1) if self.requests.rate else None,
+            "tokens_available": round(self.tokens.available()) if self.tokens.rate else None
+        }
+
+
+def parse_retry_after(headers):
+    """Seconds from a Retry-After (or retry-after-ms) header, or None"""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
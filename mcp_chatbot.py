@@ -4,190 +4,585 @@ A beautiful web UI for searching and analyzing academic papers
 """
 
 import chainlit as cl
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from groq import Groq
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from contextlib import AsyncExitStack
+from catalog_cache import catalog_key, load_catalog, mark_used, save_catalog
+from completion_cache import cache_key, get_completion_cache
+from context_budget import ContextBudget, count_messages_tokens, shorten
+from conversation_memory import ConversationMemory, summary_prompt
+from intent_router import get_intent_router
+from llm_client import get_llm_client
+from llm_scheduler import BACKGROUND
+from server_pool import get_server_pool
+from tracing import format_stats, get_tracer
+import asyncio
 import json
+import logging
 import os
+import uuid
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Paged topic resource served by research_server.py, and the footer line
+# its pages end with when there is a next page
+TOPIC_PAGE_URI = "papers://{topic}/page/{page}/size/{size}/fields/{fields}"
+NEXT_PAGE_PREFIX = "Next page: "
+TITLES_PAGE_SIZE = 50
+# How get_resource's failure messages start
+RESOURCE_ERRORS = (" Resource '", " Error fetching resource")
+
+
+def split_next_page(content):
+    """Split a paged resource into its text and the URI of its next page (or None)"""
+    head, _, last_line = content.rstrip().rpartition("\n")
+    if last_line.startswith(NEXT_PAGE_PREFIX):
+        return head.rstrip() + "\n", last_line[len(NEXT_PAGE_PREFIX):].strip()
+    return content, None
+
+
+def tool_result_items(content):
+    """The items of a list-returning tool's result as call_tool formats it, or None on error"""
+    if content.startswith("Error calling tool"):
+        return None
+    try:
+        items = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    # Servers send a list either as one JSON text item or as one text item per element
+    if len(items) == 1 and isinstance(items[0], str) and items[0].startswith("["):
+        try:
+            items = json.loads(items[0])
+        except json.JSONDecodeError:
+            pass
+    return items if isinstance(items, list) else None
+
 
 class MCP_ChatBot:
     def __init__(self):
-        self.exit_stack = AsyncExitStack()
-        # Initialize Groq client
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY not found in .env file")
-        
-        self.groq_client = Groq(api_key=api_key)
+        # Servers are shared by all chats; this chatbot only holds leases on them
+        self.server_pool = get_server_pool()
+        self.leases = []
+        # Shared async Groq client (one connection pool and fair, rate-limited scheduler per process)
+        self.llm = get_llm_client()
+        # This chat's identity in the scheduler's per-session queues
+        self.session_id = uuid.uuid4().hex
+        # Process-wide tracer: spans go to TRACE_FILE / TRACE_COLLECTOR_URL and feed /stats
+        self.tracer = get_tracer()
+        # Shared on-disk cache of completions (None unless COMPLETION_CACHE is on)
+        self.completion_cache = get_completion_cache()
+        # Answers simple requests without Groq (None if INTENT_ROUTER is off)
+        self.router = get_intent_router()
         self.model = "llama-3.3-70b-versatile"
         self.available_tools = []
         self.available_prompts = []
         self.sessions = {}
+        # Seconds a cached catalog of a network (url) server is trusted
+        self.catalog_max_age = float(os.getenv("MCP_CATALOG_MAX_AGE", "300"))
+        # URI prefix of each resource template -> session serving it
+        self.resource_templates = {}
+        # Tool calls within one assistant turn run concurrently, up to this limit
+        self.max_tool_concurrency = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+        self.tool_timeout = float(os.getenv("TOOL_TIMEOUT", "120"))
+        # Token budget for each completion in the process_query loop
+        self.context_budget = ContextBudget(
+            max_prompt_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "24000")),
+            max_tool_result_tokens=int(os.getenv("TOOL_RESULT_MAX_TOKENS", "4000")),
+            digest_tokens=int(os.getenv("TOOL_DIGEST_TOKENS", "200"))
+        )
+        # Per-iteration prompt sizes of the last query
+        self.token_report = []
+        # Earlier turns of this chat (the chatbot lives in cl.user_session, one per chat)
+        self.memory = ConversationMemory(
+            summarize=self.summarize_history,
+            window_turns=int(os.getenv("MEMORY_TURNS", "6")),
+            max_tokens=int(os.getenv("MEMORY_MAX_TOKENS", "6000"))
+        )
+        # Queries being answered right now, cancelled if the chat ends
+        self.running = set()
         self.connected = False
     
+    async def notify(self, content, author="System"):
+        """Show a status message in the chat"""
+        if author:
+            await cl.Message(content=content, author=author).send()
+        else:
+            await cl.Message(content=content).send()
+    
+    def tool_step(self, tool_name, tool_args):
+        """Chat step showing a tool call live: its arguments, progress and result"""
+        step = cl.Step(name=tool_name, type="tool")
+        step.input = tool_args
+        return step
+    
+    async def fetch_catalog(self, session):
+        """Ask a server for its tools, prompts and resources
+        
+        Returns the catalog and whether every list call succeeded; a partial catalog is not worth caching.
+        """
+        catalog = {"tools": [], "prompts": [], "resources": [], "resource_templates": []}
+        complete = True
+        
+        # List available tools
+        try:
+            response = await session.list_tools()
+            for tool in response.tools:
+                catalog["tools"].append({
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "parameters": tool.inputSchema
+                    }
+                })
+        except Exception as e:
+            complete = False
+            await self.notify(f" Error loading tools: {e}", author=None)
+        
+        # List available prompts
+        try:
+            prompts_response = await session.list_prompts()
+            if prompts_response and prompts_response.prompts:
+                for prompt in prompts_response.prompts:
+                    catalog["prompts"].append({
+                        "name": prompt.name,
+                        "description": prompt.description,
+                        "arguments": [
+                            {"name": arg.name, "description": arg.description, "required": bool(arg.required)}
+                            for arg in prompt.arguments or []
+                        ]
+                    })
+        except Exception as e:
+            complete = False
+            await self.notify(f" Error loading prompts: {e}", author=None)
+        
+        # List available resources
+        try:
+            resources_response = await session.list_resources()
+            if resources_response and resources_response.resources:
+                for resource in resources_response.resources:
+                    catalog["resources"].append(str(resource.uri))
+        except Exception as e:
+            complete = False
+            await self.notify(f" Error loading resources: {e}", author=None)
+        
+        # List resource templates such as papers://{topic}
+        try:
+            templates_response = await session.list_resource_templates()
+            if templates_response and templates_response.resourceTemplates:
+                for template in templates_response.resourceTemplates:
+                    catalog["resource_templates"].append(template.uriTemplate)
+        except Exception as e:
+            complete = False
+            await self.notify(f" Error loading resource templates: {e}", author=None)
+        
+        return catalog, complete
+    
+    def register_catalog(self, session, catalog):
+        """Route a server's tools, prompts and resources to its session"""
+        for tool_def in catalog["tools"]:
+            self.sessions[tool_def["function"]["name"]] = session
+            self.available_tools.append(tool_def)
+        for prompt in catalog["prompts"]:
+            self.sessions[prompt["name"]] = session
+            self.available_prompts.append(prompt)
+        for resource_uri in catalog["resources"]:
+            self.sessions[resource_uri] = session
+        for uri_template in catalog.get("resource_templates", []):
+            # Templated URIs are routed by the fixed part before the first "{"
+            self.resource_templates[uri_template.split("{", 1)[0]] = session
+    
     async def connect_to_server(self, server_name, server_config):
         """Connect to an MCP server"""
         try:
-            server_params = StdioServerParameters(**server_config)
-            stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
-            
-            read, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(
-                ClientSession(read, write)
+            # Lease the shared server; it routes each call to its least busy replica.
+            # The lease is lazy: the server is only spawned when something uses it.
+            key = catalog_key(server_name, server_config)
+            session = self.server_pool.lease(
+                server_name, server_config, on_first_use=lambda: mark_used(key)
             )
+            self.leases.append(session)
             
-            await session.initialize()
-            
-            # List available tools
-            try:
-                response = await session.list_tools()
-                for tool in response.tools:
-                    self.sessions[tool.name] = session
-                    tool_def = {
-                        "type": "function",
-                        "function": {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "parameters": tool.inputSchema
-                        }
-                    }
-                    self.available_tools.append(tool_def)
-            except Exception as e:
-                await cl.Message(content=f" Error loading tools: {e}").send()
-            
-            # List available prompts
-            try:
-                prompts_response = await session.list_prompts()
-                if prompts_response and prompts_response.prompts:
-                    for prompt in prompts_response.prompts:
-                        self.sessions[prompt.name] = session
-                        self.available_prompts.append({
-                            "name": prompt.name,
-                            "description": prompt.description,
-                            "arguments": prompt.arguments
-                        })
-            except Exception as e:
-                await cl.Message(content=f" Error loading prompts: {e}").send()
+            # A network server can be redeployed without any local change, so its catalog expires
+            max_age = self.catalog_max_age if server_config.get("url") else None
+            catalog = load_catalog(key, max_age=max_age)
+            if catalog is None:
+                # Nothing cached for this config yet: connect now and remember the catalog.
+                # A partial one is only used by this chat; the next chat asks the server again
+                catalog, complete = await self.fetch_catalog(await session.get())
+                if complete:
+                    save_catalog(key, catalog)
+            elif catalog.get("used") or self.server_pool.is_running(server_name, server_config):
+                # Servers chats actually use are warmed up while the user types
+                session.start()
             
-            # List available resources
-            try:
-                resources_response = await session.list_resources()
-                if resources_response and resources_response.resources:
-                    for resource in resources_response.resources:
-                        resource_uri = str(resource.uri)
-                        self.sessions[resource_uri] = session
-            except Exception as e:
-                await cl.Message(content=f" Error loading resources: {e}").send()
+            self.register_catalog(session, catalog)
         
         except Exception as e:
             raise Exception(f"Error connecting to {server_name}: {e}")
     
     async def connect_to_servers(self):
-        """Connect to all configured MCP servers"""
+        """Connect to all configured MCP servers concurrently"""
         try:
             with open("server_config.json", "r") as file:
                 data = json.load(file)
                 servers = data.get("mcpServers", {})
-                for server_name, server_config in servers.items():
-                    await self.connect_to_server(server_name, server_config)
+            await asyncio.gather(*(
+                self.connect_to_server(server_name, server_config)
+                for server_name, server_config in servers.items()
+            ))
             self.connected = True
         except Exception as e:
             raise Exception(f"Error loading server config: {e}")
     
-    async def process_query(self, query):
-        """Process a query using Groq API with tool calling"""
-        messages = [{'role': 'user', 'content': query}]
+    async def complete_turn(self, messages, on_token=None):
+        """Run one Groq completion, answering from the completion cache when possible
         
-        max_iterations = 10
-        iteration = 0
+        Returns the assistant message as a dict and the token usage Groq reported
+        (None when no API call was made).
+        """
+        request = dict(
+            model=self.model,
+            messages=messages,
+            tools=self.available_tools if self.available_tools else None,
+            tool_choice="auto",
+            max_tokens=4096,
+            temperature=0.7
+        )
         
-        while iteration < max_iterations:
-            iteration += 1
+        with self.tracer.span("llm", model=self.model, stream=on_token is not None) as span:
+            cache = self.completion_cache
+            key = None
+            if cache and cache.cacheable(request["temperature"]):
+                key = cache_key(self.model, request["temperature"], request["tools"], messages)
+                cached = await cache.get(key)
+                if cached:
+                    logger.info("completion cache hit (hit rate %.0f%%)", cache.stats()["hit_rate"] * 100)
+                    span.set(cached=True)
+                    assistant_message = cached["message"]
+                    if on_token and assistant_message["content"] and not assistant_message["tool_calls"]:
+                        await on_token(assistant_message["content"])
+                    return assistant_message, None
             
-            # Create chat completion with Groq
-            response = self.groq_client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=self.available_tools if self.available_tools else None,
-                tool_choice="auto",
-                max_tokens=4096,
-                temperature=0.7
+            assistant_message, usage = await self.request_completion(request, on_token=on_token)
+            span.set(
+                cached=False,
+                prompt_tokens=usage.get("prompt_tokens") if usage else None,
+                completion_tokens=usage.get("completion_tokens") if usage else None,
+                tool_calls=len(assistant_message["tool_calls"] or [])
             )
-            
+            if key:
+                await cache.put(key, {"message": assistant_message})
+            return assistant_message, usage
+    
+    async def request_completion(self, request, on_token=None):
+        """Send one completion request to Groq, streaming the answer to on_token if given"""
+        if on_token is None:
+            # Create chat completion with Groq (awaited, so other sessions keep running)
+            response = await self.llm.complete(session_id=self.session_id, **request)
             assistant_message = response.choices[0].message
-            
-            # Add assistant message to conversation
-            messages.append({
+            tool_calls = getattr(assistant_message, 'tool_calls', None)
+            usage = response.usage.model_dump() if getattr(response, 'usage', None) else None
+            return {
                 "role": "assistant",
                 "content": assistant_message.content,
-                "tool_calls": assistant_message.tool_calls if hasattr(assistant_message, 'tool_calls') else None
-            })
+                "tool_calls": [tool_call.model_dump() for tool_call in tool_calls] if tool_calls else None
+            }, usage
+        
+        # Streaming: forward answer tokens as they arrive, but buffer tool calls
+        # until their arguments are complete
+        content = []
+        tool_calls = {}
+        usage = None
+        async for chunk in self.llm.stream(session_id=self.session_id, **request):
+            # Groq reports usage on the last chunk, under x_groq
+            chunk_usage = getattr(chunk, 'usage', None) or getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+            if chunk_usage:
+                usage = chunk_usage.model_dump() if hasattr(chunk_usage, 'model_dump') else dict(chunk_usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
             
-            # Check if assistant wants to use tools
-            if hasattr(assistant_message, 'tool_calls') and assistant_message.tool_calls:
-                # Process each tool call
-                for tool_call in assistant_message.tool_calls:
-                    tool_name = tool_call.function.name
-                    tool_args = json.loads(tool_call.function.arguments)
-                    
-                    # Send tool usage notification
-                    await cl.Message(
-                        content=f" **Using tool:** `{tool_name}`\n**Arguments:** `{tool_args}`",
-                        author="System"
-                    ).send()
+            for tool_call in delta.tool_calls or []:
+                call = tool_calls.setdefault(tool_call.index, {
+                    "id": None,
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""}
+                })
+                if tool_call.id:
+                    call["id"] = tool_call.id
+                if tool_call.function:
+                    call["function"]["name"] += tool_call.function.name or ""
+                    call["function"]["arguments"] += tool_call.function.arguments or ""
+            
+            if delta.content:
+                content.append(delta.content)
+                # Once the turn turns into a tool call, stop showing its text
+                if not tool_calls:
+                    await on_token(delta.content)
+        
+        return {
+            "role": "assistant",
+            "content": "".join(content) or None,
+            "tool_calls": [tool_calls[index] for index in sorted(tool_calls)] or None
+        }, usage
+    
+    async def call_tool(self, tool_call):
+        """Run one tool call and return its tool message for the conversation"""
+        tool_name = tool_call["function"]["name"]
+        tool_args = json.loads(tool_call["function"]["arguments"] or "{}")
+        
+        # The tool call shows as a step that fills in as the server reports progress
+        async with self.tool_step(tool_name, tool_args) as step:
+            tool_result = await self.run_tool(tool_name, tool_args, step)
+            if step:
+                step.output = shorten(tool_result, self.context_budget.max_tool_result_tokens, "truncated")
+        
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call["id"],
+            "name": tool_name,
+            "content": tool_result
+        }
+    
+    async def run_tool(self, tool_name, tool_args, step=None):
+        """Call a tool on its server and return its result as text"""
+        with self.tracer.span("tool", tool=tool_name) as span:
+            async def on_progress(progress, total, message):
+                span.set(progress=progress, total=total)
+                if not step:
+                    return
+                step.output = message or (f"{progress:g} of {total:g}" if total else f"{progress:g}")
+                try:
+                    await step.update()
+                except Exception as e:
+                    logger.debug("could not update step for %s: %s", tool_name, e)
+            
+            # Get the MCP session for this tool
+            session = self.sessions.get(tool_name)
+            cached_result = self.memory.cached_tool_result(tool_name, tool_args)
+            if cached_result is not None:
+                # Same call earlier in this chat: reuse it instead of another round-trip
+                span.set(cached=True)
+                tool_result = cached_result
+            elif not session:
+                tool_result = f"Error calling tool: unknown tool '{tool_name}'"
+                span.fail(tool_result)
+            else:
+                try:
+                    # The correlation ID travels with the call so server-side spans join this trace
+                    result = await asyncio.wait_for(
+                        session.call_tool(tool_name, arguments=tool_args, progress_callback=on_progress,
+                                          meta=span.propagation_meta()),
+                        self.tool_timeout
+                    )
                     
-                    # Get the MCP session for this tool
-                    session = self.sessions.get(tool_name)
-                    if session:
-                        try:
-                            # Call the MCP tool
-                            result = await session.call_tool(tool_name, arguments=tool_args)
-                            
-                            # Format result
-                            if hasattr(result, 'content'):
-                                if isinstance(result.content, list):
-                                    tool_result = json.dumps([item.text if hasattr(item, 'text') else str(item) for item in result.content])
-                                else:
-                                    tool_result = str(result.content)
-                            else:
-                                tool_result = str(result)
-                            
-                            # Add tool result to messages
-                            messages.append({
-                                "role": "tool",
-                                "tool_call_id": tool_call.id,
-                                "name": tool_name,
-                                "content": tool_result
-                            })
-                            
-                        except Exception as e:
-                            error_msg = f"Error calling tool: {str(e)}"
-                            await cl.Message(content=f"{error_msg}", author="System").send()
-                            messages.append({
-                                "role": "tool",
-                                "tool_call_id": tool_call.id,
-                                "name": tool_name,
-                                "content": error_msg
-                            })
+                    # Format result
+                    if hasattr(result, 'content'):
+                        if isinstance(result.content, list):
+                            tool_result = json.dumps([item.text if hasattr(item, 'text') else str(item) for item in result.content])
+                        else:
+                            tool_result = str(result.content)
+                    else:
+                        tool_result = str(result)
+                    if getattr(result, 'isError', False):
+                        span.fail(tool_result)
+                    else:
+                        # Errors aren't remembered, so the same call later goes to the server again
+                        self.memory.remember_tool_result(tool_name, tool_args, tool_result)
                 
-                # Continue the loop to let the model process tool results
-                continue
+                except asyncio.TimeoutError:
+                    tool_result = f"Error calling tool: {tool_name} timed out after {self.tool_timeout:g}s"
+                    span.fail(tool_result)
+                    await self.notify(tool_result)
+                except Exception as e:
+                    tool_result = f"Error calling tool: {str(e)}"
+                    span.fail(tool_result)
+                    await self.notify(f"{tool_result}")
+        
+        return tool_result
+    
+    async def call_tools(self, tool_calls):
+        """Run a turn's tool calls concurrently, returning results in tool_call order"""
+        semaphore = asyncio.Semaphore(self.max_tool_concurrency)
+        
+        async def run(tool_call):
+            async with semaphore:
+                return await self.call_tool(tool_call)
+        
+        return await asyncio.gather(*(run(tool_call) for tool_call in tool_calls))
+    
+    def report_tokens(self, iteration, messages, prompt, usage):
+        """Record and log the prompt size of one loop iteration, before and after compaction"""
+        entry = {
+            "iteration": iteration,
+            "full_tokens": count_messages_tokens(messages),
+            "prompt_tokens": count_messages_tokens(prompt),
+            "reported_prompt_tokens": usage.get("prompt_tokens") if usage else None
+        }
+        self.token_report.append(entry)
+        logger.info(
+            "iteration %d: prompt ~%d tokens (~%d before compaction), Groq reported %s",
+            iteration, entry["prompt_tokens"], entry["full_tokens"], entry["reported_prompt_tokens"]
+        )
+    
+    async def process_query(self, query, on_token=None):
+        """Process a query using Groq API with tool calling
+        
+        If on_token is given, the final answer is streamed to it token by token.
+        """
+        with self.track_running():
+            answer = await self.try_fast_path(query)
+            if answer is not None:
+                return answer
+            
+            # One trace per question; its ID is the correlation ID sent to MCP servers
+            with self.tracer.span("query") as query_span:
+                answer = await self.run_query_loop(query, on_token, query_span)
+                logger.info("query %s answered in %d iterations", query_span.trace_id, len(self.token_report))
+                return answer
+    
+    @contextmanager
+    def track_running(self):
+        """Track the current task in self.running, so closing the chat cancels it
+        
+        Calls nest (execute_prompt runs process_query on the same task); only the
+        outermost one stops tracking the task when it finishes.
+        """
+        task = asyncio.current_task()
+        outermost = task not in self.running
+        self.running.add(task)
+        try:
+            yield
+        finally:
+            if outermost:
+                self.running.discard(task)
+    
+    async def try_fast_path(self, query):
+        """Answer a simple request (search a topic, list folders, show a topic) without Groq
+        
+        Returns None when the router is unsure or the direct call fails; the query then goes to the LLM.
+        Every decision is logged and counted, and fast_path spans sit next to query spans in /stats.
+        """
+        if not self.router:
+            return None
+        intent = self.router.route(query)
+        if intent is None:
+            self.router.record("llm")
+            logger.info("route: llm for %r", query)
+            return None
+        
+        with self.tracer.span("fast_path", intent=intent.name, confidence=intent.confidence) as span:
+            try:
+                answer = await self.answer_intent(intent)
+            except Exception as e:
+                logger.warning("fast path %s failed: %s", intent.name, e)
+                answer = None
+            if answer is None:
+                span.fail("fell back to the LLM")
+                self.router.record("fallback")
+                logger.info("route: fallback to llm for %r (%r)", query, intent)
+                return None
+            # Groq would have spent a completion on the tool call and another on the answer
+            self.router.record(intent.name, completions_skipped=2 if intent.name == "search_papers" else 1)
+            logger.info("route: %s for %r (%r)", intent.name, query, intent)
+        
+        self.memory.add_turn(query, answer)
+        return answer
+    
+    async def answer_intent(self, intent):
+        """Run a routed intent against the MCP servers and render its answer, or None if unavailable"""
+        if intent.name == "list_folders":
+            content = await self.get_resource("papers://folders")
+            return None if content.startswith(RESOURCE_ERRORS) else content
+        
+        topic = intent.args["topic"]
+        page_uri = TOPIC_PAGE_URI.format(topic=topic.replace(" ", "_"), page=1, size=TITLES_PAGE_SIZE, fields="titles")
+        if intent.name == "show_topic":
+            content = await self.get_resource(page_uri)
+            if content.startswith(RESOURCE_ERRORS):
+                return None
+            content, next_uri = split_next_page(content)
+            if next_uri:
+                content += f"\nType `@{topic.replace(' ', '_')}` to page through the full details."
+            return content
+        
+        if intent.name == "search_papers":
+            if "search_papers" not in self.sessions:
+                return None
+            tool_message = await self.call_tool({
+                "id": f"fast_path_{uuid.uuid4().hex[:8]}",
+                "function": {"name": "search_papers", "arguments": json.dumps(intent.args)}
+            })
+            paper_ids = tool_result_items(tool_message["content"])
+            # Anything but a list of IDs (e.g. a server-side error message) goes to the LLM to explain
+            if paper_ids is None or not all(isinstance(i, str) and i and not any(c.isspace() for c in i) for i in paper_ids):
+                return None
+            if not paper_ids:
+                return f"No papers found on arXiv for **{topic}**."
+            lines = [f"Found {len(paper_ids)} papers about **{topic}** and saved them:\n"]
+            lines.extend(f"- {paper_id}" for paper_id in paper_ids)
+            lines.append(f"\nType `@{topic.replace(' ', '_')}` to see their titles, authors and summaries.")
+            return "\n".join(lines)
+        
+        return None
+    
+    async def run_query_loop(self, query, on_token, query_span):
+        """The process_query loop: complete, run the requested tools, repeat"""
+        # Earlier turns (recent ones verbatim, older ones summarized) come first
+        messages = self.memory.context() + [{'role': 'user', 'content': query}]
+        
+        max_iterations = 10
+        iteration = 0
+        
+        self.token_report = []
+        
+        while iteration < max_iterations:
+            iteration += 1
+            
+            with self.tracer.span("iteration", iteration=iteration):
+                # Send a compacted copy: oversized tool results are truncated and
+                # results the model has already read are collapsed into digests
+                prompt = self.context_budget.fit(messages)
+                assistant_message, usage = await self.complete_turn(prompt, on_token=on_token)
+                self.report_tokens(iteration, messages, prompt, usage)
+                
+                # Add assistant message to conversation
+                messages.append(assistant_message)
+                
+                # Check if assistant wants to use tools
+                if assistant_message["tool_calls"]:
+                    # Independent tool calls run concurrently; results keep their original order
+                    messages.extend(await self.call_tools(assistant_message["tool_calls"]))
+                    
+                    # Continue the loop to let the model process tool results
+                    continue
             
             # No tool calls, we have the final response
-            if assistant_message.content:
-                return assistant_message.content
+            if assistant_message["content"]:
+                self.memory.add_turn(query, assistant_message["content"])
+                return assistant_message["content"]
             else:
+                query_span.fail("no response generated")
                 return "No response generated."
         
+        query_span.fail("maximum iterations reached")
         return "Maximum iterations reached. Please try again with a simpler query."
     
+    async def summarize_history(self, summary, turns):
+        """Fold turns that left the memory window into the running summary"""
+        # Summaries can wait: questions from every chat go first
+        response = await self.llm.complete(
+            session_id=self.session_id,
+            priority=BACKGROUND,
+            model=self.model,
+            messages=[{"role": "user", "content": summary_prompt(summary, turns)}],
+            max_tokens=400,
+            temperature=0.2
+        )
+        return response.choices[0].message.content or summary
+    
     async def list_prompts(self):
         """List all available prompts"""
         if not self.available_prompts:
@@ -213,48 +608,80 @@ class MCP_ChatBot:
         if not session:
             return f" Prompt '{prompt_name}' not found."
         
-        try:
-            await cl.Message(content=f"⚡ Executing prompt: **{prompt_name}**", author="System").send()
-            result = await session.get_prompt(prompt_name, arguments=args)
+        with self.track_running():
+            try:
+                await self.notify(f"⚡ Executing prompt: **{prompt_name}**")
+                result = await session.get_prompt(prompt_name, arguments=args)
             
-            if result and result.messages:
-                # Extract the prompt content
-                prompt_content = result.messages[0].content
+                if result and result.messages:
+                    # Extract the prompt content
+                    prompt_content = result.messages[0].content
                 
-                # Handle different content formats
-                if isinstance(prompt_content, str):
-                    text = prompt_content
-                elif hasattr(prompt_content, 'text'):
-                    text = prompt_content.text
-                else:
-                    text = " ".join(
-                        item.text if hasattr(item, 'text') else str(item) 
-                        for item in prompt_content
-                    )
+                    # Handle different content formats
+                    if isinstance(prompt_content, str):
+                        text = prompt_content
+                    elif hasattr(prompt_content, 'text'):
+                        text = prompt_content.text
+                    else:
+                        text = " ".join(
+                            item.text if hasattr(item, 'text') else str(item) 
+                            for item in prompt_content
+                        )
                 
-                # Process the prompt with Groq
-                response = await self.process_query(text)
-                return response
-        except Exception as e:
-            return f" Error executing prompt: {e}"
+                    # Process the prompt with Groq
+                    response = await self.process_query(text)
+                    return response
+            except Exception as e:
+                return f" Error executing prompt: {e}"
     
     async def get_resource(self, resource_uri):
         """Fetch a resource by URI"""
         session = self.sessions.get(resource_uri)
+        if not session:
+            # Longest matching template prefix, e.g. papers:// for papers://{topic}
+            prefixes = [p for p in self.resource_templates if resource_uri.startswith(p)]
+            if prefixes:
+                session = self.resource_templates[max(prefixes, key=len)]
         if not session:
             return f" Resource '{resource_uri}' not found."
         
-        try:
-            result = await session.read_resource(resource_uri)
-            if result and result.contents:
-                return result.contents[0].text
-            return "No content available."
-        except Exception as e:
-            return f" Error fetching resource: {e}"
+        with self.tracer.span("resource", uri=resource_uri) as span:
+            try:
+                result = await session.read_resource(resource_uri)
+                if result and result.contents:
+                    return result.contents[0].text
+                return "No content available."
+            except Exception as e:
+                span.fail(e)
+                return f" Error fetching resource: {e}"
+    
+    def stats(self):
+        """Rolling latency histograms and error rates of this process, as markdown"""
+        tracer = self.tracer
+        result = format_stats(tracer.stats.snapshot(), tracer.stats.window)
+        
+        if self.router:
+            router = self.router.stats()
+            result += "\n\n**Answered without Groq:** " + ", ".join(
+                f"{name.replace('_', ' ')} {value}" for name, value in router.items() if name != "by_intent"
+            )
+        
+        scheduler = self.llm.scheduler.stats()
+        result += "\n\n**Groq queue:** " + ", ".join(
+            f"{name.replace('_', ' ')} {value}" for name, value in scheduler.items()
+            if value is not None and name != "queued_by_priority"
+        )
+        return result
     
     async def cleanup(self):
-        """Clean up resources"""
-        await self.exit_stack.aclose()
+        """Stop this chat's queries and release its leases on the shared servers"""
+        # Cancelled tool calls tell their servers to stop, so a closed chat doesn't keep arXiv busy
+        for task in list(self.running):
+            if task is not asyncio.current_task():
+                task.cancel()
+        leases, self.leases = self.leases, []
+        for session in leases:
+            await session.release()
 
 
 # Global chatbot instance
@@ -273,8 +700,10 @@ async def start():
                 "**Commands:**\n"
                 "- Type naturally to search papers\n"
                 "- `@folders` - See all available topics\n"
-                "- `@<topic>` - View papers on a specific topic\n"
+                "- `@<topic>` - View papers on a specific topic, a page at a time\n"
                 "- `/prompts` - List all prompt templates\n"
+                "- `/stats` - Latency and error rates of recent requests\n"
+                "- `/clear` - Forget the conversation so far\n"
                 "- `/prompt <name> arg1=value1` - Execute a prompt\n\n"
                 "Connecting to MCP servers...",
         author="System"
@@ -333,7 +762,7 @@ async def main(message: cl.Message):
             ).send()
             
             content = await chatbot.get_resource(resource_uri)
-            await cl.Message(content=content).send()
+            await send_page(content, topic=None if topic == "folders" else topic)
             return
         
         # Handle /command syntax
@@ -352,6 +781,15 @@ async def main(message: cl.Message):
                 result = await chatbot.list_prompts()
                 await cl.Message(content=result).send()
                 return
+            
+            elif command == "stats":
+                await cl.Message(content=chatbot.stats(), author="System").send()
+                return
+            
+            elif command == "clear":
+                chatbot.memory.clear()
+                await cl.Message(content="Conversation memory cleared.", author="System").send()
+                return
                 
             elif command == "prompt":
                 if len(parts) < 2:
@@ -382,11 +820,11 @@ async def main(message: cl.Message):
                 return
         
         # Natural language query
-        # Show thinking indicator
+        # Show thinking indicator, then stream the final answer into it
         msg = cl.Message(content="")
         await msg.send()
         
-        response = await chatbot.process_query(query)
+        response = await chatbot.process_query(query, on_token=msg.stream_token)
         
         # Update message with response
         msg.content = response
@@ -399,6 +837,29 @@ async def main(message: cl.Message):
         ).send()
 
 
+async def send_page(content, topic=None):
+    """Show a resource page, with a Load more button if it has a next page"""
+    content, next_uri = split_next_page(content)
+    actions = []
+    if next_uri:
+        actions.append(cl.Action(name="load_more", payload={"uri": next_uri}, label="Load more"))
+    if topic:
+        titles_uri = TOPIC_PAGE_URI.format(topic=topic, page=1, size=TITLES_PAGE_SIZE, fields="titles")
+        actions.append(cl.Action(name="load_more", payload={"uri": titles_uri}, label="Titles only"))
+    await cl.Message(content=content, actions=actions).send()
+
+
+@cl.action_callback("load_more")
+async def load_more(action: cl.Action):
+    """Fetch the page a Load more or Titles only button points to"""
+    chatbot = cl.user_session.get("chatbot")
+    if not chatbot:
+        return
+    await action.remove()
+    content = await chatbot.get_resource(action.payload["uri"])
+    await send_page(content)
+
+
 @cl.on_chat_end
 async def end():
     """Cleanup when chat ends"""
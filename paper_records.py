@@ -0,0 +1,98 @@
+"""
+Compact in-memory paper records for the research server.
+
+Paper stores hand out PaperRecord objects instead of one dict per paper: the
+fields live in slots, author names are interned so a name shared by many
+papers is stored once, and the summary (by far the largest field) can be left
+on disk until something reads it. Records also answer record["title"] and
+record.get("published") like the dicts search_papers produces, so code
+written against dicts keeps working.
+"""
+
+import sys
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+FIELDS = ("title", "authors", "summary", "pdf_url", "published", "entry_id")
+
+
+def intern_authors(authors: Iterable[str]) -> Tuple[str, ...]:
+    """Author names as a tuple of interned strings."""
+    return tuple(sys.intern(str(name)) for name in authors)
+
+
+class PaperRecord:
+    """One stored paper.
+
+    Args:
+        summary: The summary, or None to load it on first access through summary_ref
+        summary_ref: (load, key) such that load(key) returns the summary
+    """
+
+    __slots__ = ("entry_id", "title", "authors", "published", "pdf_url", "_summary", "_summary_ref")
+
+    def __init__(self, entry_id: str, title: str, authors: Iterable[str], published: Optional[str] = None,
+                 pdf_url: Optional[str] = None, summary: Optional[str] = None,
+                 summary_ref: Optional[Tuple[Callable[[Hashable], str], Hashable]] = None):
+        self.entry_id = entry_id
+        self.title = title
+        self.authors = intern_authors(authors)
+        self.published = published
+        self.pdf_url = pdf_url
+        self._summary = summary
+        self._summary_ref = summary_ref
+
+    @classmethod
+    def from_dict(cls, paper: Dict[str, Any]) -> "PaperRecord":
+        if isinstance(paper, cls):
+            return paper
+        return cls(paper["entry_id"], paper["title"], paper.get("authors") or (), paper.get("published"),
+                   paper.get("pdf_url"), paper.get("summary") or "")
+
+    @property
+    def summary(self) -> str:
+        if self._summary is None:
+            if self._summary_ref is None:
+                return ""
+            load, key = self._summary_ref
+            self._summary = load(key)
+            self._summary_ref = None
+        return self._summary
+
+    @property
+    def summary_key(self) -> Optional[Hashable]:
+        """Key the summary will be loaded by, or None if it is loaded already."""
+        return self._summary_ref[1] if self._summary is None and self._summary_ref else None
+
+    def set_summary(self, summary: str):
+        self._summary = summary
+        self._summary_ref = None
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in FIELDS else default
+
+    def __contains__(self, key: str) -> bool:
+        return key in FIELDS
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The paper as the dict search_papers stores (loads the summary if needed)."""
+        return {
+            "title": self.title,
+            "authors": list(self.authors),
+            "summary": self.summary,
+            "pdf_url": self.pdf_url,
+            "published": self.published,
+            "entry_id": self.entry_id
+        }
+
+    def __repr__(self) -> str:
+        return f"PaperRecord({self.entry_id!r}, {self.title!r})"
+
+
+def as_dict(paper: Any) -> Dict[str, Any]:
+    """A paper given as a dict or a PaperRecord, as a dict."""
+    return paper.to_dict() if isinstance(paper, PaperRecord) else paper
@@ -0,0 +1,794 @@
+"""
+Storage backends for papers found by the research server.
+
+The JSON backend keeps one folder per topic under papers/. The
+SQLite backend keeps every topic in a single indexed database file, so listing
+topics and reading a topic no longer scan the directory or re-parse whole files.
+The columnar backend keeps one folder per topic like the JSON backend, but with
+the summaries in a file of their own, read by offset only when needed.
+
+Reads return compact PaperRecord objects (see paper_records.py); writes take
+dicts as produced by search_papers, or records.
+"""
+
+import itertools
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from paper_records import PaperRecord, as_dict
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks on Windows; writes from one process are still safe
+    fcntl = None
+
+# papers_info.json is the original per-topic layout; it is converted to
+# papers.jsonl the first time the topic is written to
+PAPERS_FILE = "papers_info.json"
+JSONL_FILE = "papers.jsonl"
+LOCK_FILE = ".lock"
+# Touched after every write to a file-based store, so the catalog version is one stat
+VERSION_FILE = ".version"
+DB_FILE = "papers.db"
+# Columnar layout: small fields one JSON array per line, summaries back to back
+RECORDS_FILE = "records.jsonl"
+SUMMARIES_FILE = "summaries.txt"
+
+
+def topic_key(topic: str) -> str:
+    """Normalize a topic name the way folders have always been named."""
+    return topic.lower().replace(" ", "_")
+
+
+class PaperStore:
+    """Interface shared by the storage backends.
+
+    Papers have title, authors, summary, pdf_url, published and entry_id
+    fields, as produced by search_papers. They are written as dicts (or
+    records) and read back as PaperRecords.
+    """
+
+    def add_papers(self, topic: str, papers: List[Dict]) -> int:
+        """Add papers to a topic, skipping any whose entry_id is already stored.
+
+        Returns:
+            Number of papers actually added
+        """
+        raise NotImplementedError
+
+    def upsert_papers(self, topic: str, papers: List[Dict]) -> None:
+        """Insert papers into a topic, replacing existing ones with the same entry_id."""
+        raise NotImplementedError
+
+    def list_topics(self) -> List[str]:
+        """Return all topics that have stored papers."""
+        raise NotImplementedError
+
+    def get_papers(self, topic: str) -> List[PaperRecord]:
+        """Return the papers stored for a topic, in the order they were added."""
+        raise NotImplementedError
+
+    def get_papers_page(self, topic: str, offset: int, limit: int,
+                        fields: Optional[Iterable[str]] = None) -> Tuple[List[PaperRecord], int]:
+        """Return up to limit papers of a topic starting at offset, and the topic's total count.
+
+        Args:
+            fields: Fields the caller will read (default all). Backends that can
+                skip reading summaries do so when "summary" is not among them;
+                the records then load their summary on first access.
+        """
+        papers = self.get_papers(topic)
+        return papers[offset:offset + limit], len(papers)
+
+    def topic_counts(self) -> Dict[str, int]:
+        """Return the number of papers in each topic."""
+        return {topic: len(self.get_papers(topic)) for topic in self.list_topics()}
+
+    def catalog_version(self) -> Hashable:
+        """Return a value that changes whenever any topic is created or written to."""
+        return tuple((topic, self.topic_version(topic)) for topic in sorted(self.list_topics()))
+
+    def topic_version(self, topic: str) -> Optional[Hashable]:
+        """Return a value that changes whenever the topic is written to, or None if it has no papers."""
+        raise NotImplementedError
+
+    def has_topic(self, topic: str) -> bool:
+        return topic_key(topic) in self.list_topics()
+
+    def find_paper(self, entry_id: str) -> Optional[Dict]:
+        """Look a paper up by its arXiv entry_id, in whichever topic it was stored."""
+        for topic in self.list_topics():
+            for paper in self.get_papers(topic):
+                if paper["entry_id"] == entry_id:
+                    return paper
+        return None
+
+
+def _count_lines(path: str) -> int:
+    """Number of complete lines in a file, counted without decoding it."""
+    count = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            count += block.count(b"\n")
+    return count
+
+
+class JsonPaperStore(PaperStore):
+    """One folder per topic holding an append-only JSON Lines file.
+
+    New papers are appended under a file lock, so adding a few papers to a big
+    topic costs only the new lines. Rewrites (replacing existing records or
+    converting an old papers_info.json) go through a temp file and a rename, so
+    readers never see a torn file.
+    """
+
+    def __init__(self, paper_dir: str):
+        self.paper_dir = paper_dir
+        # topic -> (inode, bytes already scanned, entry_ids seen in those bytes)
+        self._known = {}
+        # topic -> (topic_version, paper count), so listing counts only re-reads changed topics
+        self._counts = {}
+        # Bumped by every write from this process; VERSION_FILE catches writes from other processes
+        self._generations = itertools.count(1)
+        self._generation = 0
+
+    def _topic_dir(self, topic: str) -> str:
+        return os.path.join(self.paper_dir, topic_key(topic))
+
+    def _jsonl_file(self, topic: str) -> str:
+        return os.path.join(self._topic_dir(topic), JSONL_FILE)
+
+    def _legacy_file(self, topic: str) -> str:
+        return os.path.join(self._topic_dir(topic), PAPERS_FILE)
+
+    @contextmanager
+    def _locked(self, topic: str):
+        """Hold an exclusive lock on the topic while writing to it."""
+        os.makedirs(self._topic_dir(topic), exist_ok=True)
+        with open(os.path.join(self._topic_dir(topic), LOCK_FILE), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _encode(papers: List[Dict]) -> str:
+        return "".join(json.dumps(as_dict(paper), separators=(",", ":")) + "\n" for paper in papers)
+
+    @staticmethod
+    def _line_entry_id(line: bytes) -> str:
+        return json.loads(line)["entry_id"]
+
+    def _known_ids(self, topic: str) -> set:
+        """Return the entry_ids in papers.jsonl, scanning only bytes appended since the last call.
+
+        Must be called with the topic lock held.
+        """
+        path = self._jsonl_file(topic)
+        if not os.path.exists(path):
+            self._known.pop(topic_key(topic), None)
+            return set()
+
+        inode = os.stat(path).st_ino
+        known_inode, offset, ids = self._known.get(topic_key(topic), (None, 0, set()))
+        if known_inode != inode:
+            # The file was rewritten; start over
+            offset, ids = 0, set()
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                ids.add(self._line_entry_id(line))
+
+        self._known[topic_key(topic)] = (inode, offset, ids)
+        return ids
+
+    def _rewrite(self, topic: str, papers: List[Dict]) -> None:
+        """Atomically replace papers.jsonl. Must be called with the topic lock held."""
+        path = self._jsonl_file(topic)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self._encode(papers))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._known.pop(topic_key(topic), None)
+
+    def _convert_legacy(self, topic: str) -> None:
+        """Turn an old papers_info.json into papers.jsonl. Must be called with the topic lock held."""
+        legacy_path = self._legacy_file(topic)
+        if os.path.exists(legacy_path) and not os.path.exists(self._jsonl_file(topic)):
+            with open(legacy_path, 'r') as f:
+                papers = json.load(f)
+            self._rewrite(topic, papers)
+            os.remove(legacy_path)
+
+    def _append(self, topic: str, papers: List[Dict]) -> None:
+        """Append papers in a single write. Must be called with the topic lock held."""
+        with open(self._jsonl_file(topic), 'a') as f:
+            f.write(self._encode(papers))
+            f.flush()
+
+    def _written(self) -> None:
+        """Record a write for catalog_version. Called after the write, lock held or not."""
+        self._generation = next(self._generations)
+        now = time.time_ns()
+        try:
+            os.utime(os.path.join(self.paper_dir, VERSION_FILE), ns=(now, now))
+        except FileNotFoundError:
+            os.makedirs(self.paper_dir, exist_ok=True)
+            open(os.path.join(self.paper_dir, VERSION_FILE), 'a').close()
+
+    def add_papers(self, topic: str, papers: List[Dict]) -> int:
+        with self._locked(topic):
+            self._convert_legacy(topic)
+            known = self._known_ids(topic)
+            new_papers = []
+            for paper in papers:
+                if paper["entry_id"] not in known:
+                    known.add(paper["entry_id"])
+                    new_papers.append(paper)
+            if new_papers:
+                self._append(topic, new_papers)
+        if new_papers:
+            self._written()
+        return len(new_papers)
+
+    def upsert_papers(self, topic: str, papers: List[Dict]) -> None:
+        with self._locked(topic):
+            self._convert_legacy(topic)
+            known = self._known_ids(topic)
+            if not any(paper["entry_id"] in known for paper in papers):
+                # Nothing to replace, so appending is enough
+                self._append(topic, list({p["entry_id"]: p for p in papers}.values()))
+            else:
+                merged = {paper["entry_id"]: paper for paper in self.get_papers(topic)}
+                for paper in papers:
+                    merged[paper["entry_id"]] = paper
+                self._rewrite(topic, list(merged.values()))
+        self._written()
+
+    def list_topics(self) -> List[str]:
+        topics = []
+        if os.path.exists(self.paper_dir):
+            for topic_dir in os.listdir(self.paper_dir):
+                topic_path = os.path.join(self.paper_dir, topic_dir)
+                if (os.path.exists(os.path.join(topic_path, JSONL_FILE))
+                        or os.path.exists(os.path.join(topic_path, PAPERS_FILE))):
+                    topics.append(topic_dir)
+        return topics
+
+    def get_papers(self, topic: str) -> List[PaperRecord]:
+        path = self._jsonl_file(topic)
+        if os.path.exists(path):
+            papers = []
+            with open(path, 'r') as f:
+                for line in f:
+                    # A line without its newline is still being appended
+                    if line.endswith("\n"):
+                        papers.append(PaperRecord.from_dict(json.loads(line)))
+            return papers
+
+        legacy_path = self._legacy_file(topic)
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'r') as f:
+                return [PaperRecord.from_dict(paper) for paper in json.load(f)]
+        return []
+
+    def get_papers_page(self, topic: str, offset: int, limit: int,
+                        fields: Optional[Iterable[str]] = None) -> Tuple[List[PaperRecord], int]:
+        path = self._jsonl_file(topic)
+        if not os.path.exists(path):
+            return super().get_papers_page(topic, offset, limit)
+
+        # Count every line but only parse the ones on the page
+        papers = []
+        total = 0
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                if offset <= total < offset + limit:
+                    papers.append(PaperRecord.from_dict(json.loads(line)))
+                total += 1
+        return papers, total
+
+    def catalog_version(self) -> Hashable:
+        # One stat instead of listing and stating every topic; writes from any
+        # process touch the version file, and our own also bump the generation
+        path = os.path.join(self.paper_dir, VERSION_FILE)
+        try:
+            return (self._generation, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            # Nothing written since the store was created, or only by an older version
+            self._written()
+            return (self._generation, os.stat(path).st_mtime_ns)
+
+    def topic_counts(self) -> Dict[str, int]:
+        counts = {}
+        for topic in self.list_topics():
+            version = self.topic_version(topic)
+            cached = self._counts.get(topic)
+            if cached is None or cached[0] != version:
+                cached = (version, self._count_papers(topic))
+                self._counts[topic] = cached
+            counts[topic] = cached[1]
+        return counts
+
+    def _count_papers(self, topic: str) -> int:
+        path = self._jsonl_file(topic)
+        if os.path.exists(path):
+            return _count_lines(path)
+        return len(self.get_papers(topic))
+
+    def topic_version(self, topic: str) -> Optional[Hashable]:
+        for path in (self._jsonl_file(topic), self._legacy_file(topic)):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            # Appends change the size even within one mtime tick; rewrites change the inode
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return None
+
+    def has_topic(self, topic: str) -> bool:
+        return os.path.exists(self._jsonl_file(topic)) or os.path.exists(self._legacy_file(topic))
+
+
+class ColumnarPaperStore(JsonPaperStore):
+    """One folder per topic, with the summaries stored apart from the other fields.
+
+        records.jsonl   [entry_id, title, authors, published, pdf_url, summary offset, summary length] per line
+        summaries.txt   UTF-8 summaries back to back, only ever appended to
+
+    Counting and paging a topic read only the small records, found through an
+    in-memory index of line offsets that is extended as lines are appended.
+    Summaries are read by offset when a page shows them, or when a record's
+    summary is first used. Records are written after their summaries, and a
+    rewrite only replaces records.jsonl (appending the summaries that changed),
+    so readers never see a record pointing at bytes that are not there. JSON topic folders
+    are converted the first time they are written to.
+    """
+
+    def __init__(self, paper_dir: str):
+        super().__init__(paper_dir)
+        # Topics not converted yet are read through the JSON backend
+        self._json = JsonPaperStore(paper_dir)
+        # topic -> (inode, bytes scanned, start offset of every complete line of records.jsonl)
+        self._offsets = {}
+        self._offsets_lock = threading.Lock()
+
+    def _jsonl_file(self, topic: str) -> str:
+        return os.path.join(self._topic_dir(topic), RECORDS_FILE)
+
+    def _summaries_file(self, topic: str) -> str:
+        return os.path.join(self._topic_dir(topic), SUMMARIES_FILE)
+
+    @staticmethod
+    def _line_entry_id(line: bytes) -> str:
+        return json.loads(line)[0]
+
+    def _write_summaries(self, topic: str, papers: List[Dict],
+                         stored: Optional[Dict[str, Tuple[int, int]]] = None) -> List[Tuple[int, int]]:
+        """Append the papers' summaries and return the (offset, length) of each.
+
+        Must be called with the topic lock held.
+
+        Args:
+            stored: entry_id -> (offset, length) of summaries already in the file; a paper
+                whose summary is unchanged keeps its stored copy instead of appending another
+        """
+        key = topic_key(topic)
+        refs = []
+        encoded = []
+        with open(self._summaries_file(topic), 'a+b') as f:
+            offset = f.seek(0, os.SEEK_END)
+            existing = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stored and offset else None
+            try:
+                for paper in papers:
+                    ref = stored.get(paper["entry_id"]) if existing is not None else None
+                    if ref and isinstance(paper, PaperRecord) and paper.summary_key == (key, *ref):
+                        # Read from this topic and never loaded, so unchanged
+                        refs.append(ref)
+                        continue
+                    data = (paper["summary"] or "").encode("utf-8")
+                    if ref and ref[1] == len(data) and existing[ref[0]:ref[0] + ref[1]] == data:
+                        refs.append(ref)
+                        continue
+                    refs.append((offset, len(data)))
+                    encoded.append(data)
+                    offset += len(data)
+            finally:
+                if existing is not None:
+                    existing.close()
+            f.write(b"".join(encoded))
+            f.flush()
+        return refs
+
+    @staticmethod
+    def _encode_records(papers: List[Dict], refs: List[Tuple[int, int]]) -> str:
+        return "".join(
+            json.dumps([p["entry_id"], p["title"], list(p["authors"]), p.get("published"), p.get("pdf_url"),
+                        offset, length], separators=(",", ":")) + "\n"
+            for p, (offset, length) in zip(papers, refs)
+        )
+
+    def _append(self, topic: str, papers: List[Dict]) -> None:
+        refs = self._write_summaries(topic, papers)
+        with open(self._jsonl_file(topic), 'a') as f:
+            f.write(self._encode_records(papers, refs))
+            f.flush()
+
+    def _rewrite(self, topic: str, papers: List[Dict]) -> None:
+        # Unchanged summaries are reused, so repeated upserts don't grow summaries.txt
+        stored = {}
+        if os.path.exists(self._jsonl_file(topic)):
+            for line in self._read_lines(topic)[0]:
+                record = json.loads(line)
+                stored[record[0]] = (record[5], record[6])
+        refs = self._write_summaries(topic, papers, stored)
+        path = self._jsonl_file(topic)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self._encode_records(papers, refs))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._known.pop(topic_key(topic), None)
+
+    def _convert_legacy(self, topic: str) -> None:
+        """Turn a JSON topic folder into the columnar layout. Must be called with the topic lock held."""
+        if os.path.exists(self._jsonl_file(topic)) or not self._json.has_topic(topic):
+            return
+        self._rewrite(topic, self._json.get_papers(topic))
+        for name in (JSONL_FILE, PAPERS_FILE):
+            path = os.path.join(self._topic_dir(topic), name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _line_offsets(self, topic: str, f) -> array:
+        """Start offsets of the complete lines of the open records file f, scanning only new bytes."""
+        stat = os.fstat(f.fileno())
+        with self._offsets_lock:
+            inode, scanned, offsets = self._offsets.get(topic_key(topic), (None, 0, None))
+            if inode != stat.st_ino:
+                # New or rewritten file; start over
+                scanned, offsets = 0, array("Q")
+            if scanned < stat.st_size:
+                f.seek(scanned)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    offsets.append(scanned)
+                    scanned += len(line)
+            self._offsets[topic_key(topic)] = (stat.st_ino, scanned, offsets)
+            return offsets
+
+    def _to_records(self, topic: str, lines: List[bytes], load_summaries: bool) -> List[PaperRecord]:
+        key = topic_key(topic)
+        records = []
+        for line in lines:
+            entry_id, title, authors, published, pdf_url, offset, length = json.loads(line)
+            records.append(PaperRecord(entry_id, title, authors, published, pdf_url,
+                                       summary_ref=(self._read_summary, (key, offset, length))))
+        if load_summaries and records:
+            self._load_summaries(topic, records)
+        return records
+
+    def _read_summary(self, ref: Tuple[str, int, int]) -> str:
+        key, offset, length = ref
+        with open(os.path.join(self.paper_dir, key, SUMMARIES_FILE), 'rb') as f:
+            f.seek(offset)
+            return f.read(length).decode("utf-8")
+
+    def _load_summaries(self, topic: str, records: List[PaperRecord]) -> None:
+        """Fill in the summaries of records read from this topic, mapping the file once."""
+        with open(self._summaries_file(topic), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                for record in records:
+                    record.set_summary("")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as summaries:
+                for record in records:
+                    _, offset, length = record.summary_key
+                    record.set_summary(summaries[offset:offset + length].decode("utf-8"))
+
+    def _read_lines(self, topic: str, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[bytes], int]:
+        with open(self._jsonl_file(topic), 'rb') as f:
+            offsets = self._line_offsets(topic, f)
+            total = len(offsets)
+            end = total if limit is None else min(total, offset + limit)
+            if offset >= end:
+                return [], total
+            f.seek(offsets[offset])
+            return [f.readline() for _ in range(end - offset)], total
+
+    def get_papers(self, topic: str) -> List[PaperRecord]:
+        if not os.path.exists(self._jsonl_file(topic)):
+            return self._json.get_papers(topic)
+        lines, _ = self._read_lines(topic)
+        return self._to_records(topic, lines, load_summaries=True)
+
+    def get_papers_page(self, topic: str, offset: int, limit: int,
+                        fields: Optional[Iterable[str]] = None) -> Tuple[List[PaperRecord], int]:
+        if not os.path.exists(self._jsonl_file(topic)):
+            return self._json.get_papers_page(topic, offset, limit, fields)
+        lines, total = self._read_lines(topic, offset, limit)
+        return self._to_records(topic, lines, load_summaries=fields is None or "summary" in fields), total
+
+    def _count_papers(self, topic: str) -> int:
+        if not os.path.exists(self._jsonl_file(topic)):
+            return self._json._count_papers(topic)
+        with open(self._jsonl_file(topic), 'rb') as f:
+            return len(self._line_offsets(topic, f))
+
+    def find_paper(self, entry_id: str) -> Optional[PaperRecord]:
+        needle = json.dumps(entry_id).encode()
+        for topic in self.list_topics():
+            if not os.path.exists(self._jsonl_file(topic)):
+                paper = next((p for p in self._json.get_papers(topic) if p["entry_id"] == entry_id), None)
+                if paper is not None:
+                    return paper
+                continue
+            with open(self._jsonl_file(topic), 'rb') as f:
+                for line in f:
+                    # Only parse lines that can match
+                    if needle in line and line.endswith(b"\n") and json.loads(line)[0] == entry_id:
+                        return self._to_records(topic, [line], load_summaries=True)[0]
+        return None
+
+    def list_topics(self) -> List[str]:
+        topics = []
+        if os.path.exists(self.paper_dir):
+            for topic_dir in os.listdir(self.paper_dir):
+                topic_path = os.path.join(self.paper_dir, topic_dir)
+                if any(os.path.exists(os.path.join(topic_path, name))
+                       for name in (RECORDS_FILE, JSONL_FILE, PAPERS_FILE)):
+                    topics.append(topic_dir)
+        return topics
+
+    def topic_version(self, topic: str) -> Optional[Hashable]:
+        try:
+            stat = os.stat(self._jsonl_file(topic))
+        except FileNotFoundError:
+            return self._json.topic_version(topic)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def has_topic(self, topic: str) -> bool:
+        return os.path.exists(self._jsonl_file(topic)) or self._json.has_topic(topic)
+
+
+class SqlitePaperStore(PaperStore):
+    """All topics in one SQLite database, indexed on topic, entry_id and published date."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS papers (
+            topic TEXT NOT NULL,
+            entry_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            authors TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            pdf_url TEXT,
+            published TEXT,
+            PRIMARY KEY (topic, entry_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_papers_entry_id ON papers (entry_id);
+        -- Index entries end in the rowid, so this also orders a topic's papers by insertion
+        CREATE INDEX IF NOT EXISTS idx_papers_topic ON papers (topic);
+        CREATE INDEX IF NOT EXISTS idx_papers_topic_published ON papers (topic, published);
+        CREATE TABLE IF NOT EXISTS topics (
+            topic TEXT PRIMARY KEY,
+            paper_count INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, paper_dir: str, db_path: str = None):
+        self.paper_dir = paper_dir
+        self.db_path = db_path or os.path.join(paper_dir, DB_FILE)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        # search_papers writes from worker threads, so each thread gets its own connection
+        self._local = threading.local()
+        # Bumped on every write through this store; part of catalog_version
+        self._generations = itertools.count(1)
+        self._generation = 0
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL lets resource reads proceed while a search is writing
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, topic: str, papers: List[Dict], on_conflict: str) -> int:
+        key = topic_key(topic)
+        rows = [
+            (key, p["entry_id"], p["title"], json.dumps(list(p["authors"])), p["summary"],
+             p.get("pdf_url"), p.get("published"))
+            for p in papers
+        ]
+        conn = self._connect()
+        # One transaction: readers see either none or all of the new papers
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                f"""
+                INSERT INTO papers (topic, entry_id, title, authors, summary, pdf_url, published)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (topic, entry_id) {on_conflict}
+                """,
+                rows
+            )
+            changed = conn.total_changes - before
+            # Nothing new: leave updated_at alone so cached pages of the topic stay valid,
+            # but still record a topic that is searched for the first time
+            update = "DO UPDATE SET paper_count = excluded.paper_count, updated_at = excluded.updated_at"
+            conn.execute(
+                f"""
+                INSERT INTO topics (topic, paper_count, updated_at)
+                VALUES (?, (SELECT COUNT(*) FROM papers WHERE topic = ?), ?)
+                ON CONFLICT (topic) {update if changed else "DO NOTHING"}
+                """,
+                (key, key, time.time())
+            )
+            touched = conn.total_changes - before
+        if touched:
+            self._generation = next(self._generations)
+        return changed
+
+    def add_papers(self, topic: str, papers: List[Dict]) -> int:
+        return self._write(topic, papers, "DO NOTHING")
+
+    def upsert_papers(self, topic: str, papers: List[Dict]) -> None:
+        self._write(topic, papers, """DO UPDATE SET
+                    title = excluded.title,
+                    authors = excluded.authors,
+                    summary = excluded.summary,
+                    pdf_url = excluded.pdf_url,
+                    published = excluded.published""")
+
+    def list_topics(self) -> List[str]:
+        rows = self._connect().execute("SELECT topic FROM topics ORDER BY topic")
+        return [row["topic"] for row in rows]
+
+    def get_papers(self, topic: str) -> List[PaperRecord]:
+        rows = self._connect().execute(
+            "SELECT * FROM papers WHERE topic = ? ORDER BY rowid", (topic_key(topic),)
+        )
+        return [self._to_paper(row) for row in rows]
+
+    def get_papers_page(self, topic: str, offset: int, limit: int,
+                        fields: Optional[Iterable[str]] = None) -> Tuple[List[PaperRecord], int]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT paper_count FROM topics WHERE topic = ?", (topic_key(topic),)
+        ).fetchone()
+        if row is None:
+            return [], 0
+        # Leave summaries in the database unless the page shows them
+        columns = "*" if fields is None or "summary" in fields else (
+            "rowid, entry_id, title, authors, pdf_url, published"
+        )
+        # The page's rowids come from the topic index alone; only those rows are read
+        rows = conn.execute(
+            f"""
+            SELECT {columns} FROM papers WHERE rowid IN (
+                SELECT rowid FROM papers WHERE topic = ? ORDER BY rowid LIMIT ? OFFSET ?
+            ) ORDER BY rowid
+            """,
+            (topic_key(topic), limit, offset)
+        )
+        return [self._to_paper(r) for r in rows], row["paper_count"]
+
+    def _read_summary(self, rowid: int) -> str:
+        row = self._connect().execute("SELECT summary FROM papers WHERE rowid = ?", (rowid,)).fetchone()
+        return row["summary"] if row else ""
+
+    def topic_counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT topic, paper_count FROM topics ORDER BY topic")
+        return {row["topic"]: row["paper_count"] for row in rows}
+
+    def catalog_version(self) -> Hashable:
+        # data_version changes when another connection (thread or process) commits;
+        # it is per connection, hence the thread ID. Our own commits bump the generation.
+        data_version = self._connect().execute("PRAGMA data_version").fetchone()[0]
+        return (threading.get_ident(), data_version, self._generation)
+
+    def topic_version(self, topic: str) -> Optional[Hashable]:
+        # updated_at is stamped in the same transaction as every write to the topic
+        row = self._connect().execute(
+            "SELECT updated_at, paper_count FROM topics WHERE topic = ?", (topic_key(topic),)
+        ).fetchone()
+        return (row["updated_at"], row["paper_count"]) if row else None
+
+    def has_topic(self, topic: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM topics WHERE topic = ?", (topic_key(topic),)
+        ).fetchone()
+        return row is not None
+
+    def find_paper(self, entry_id: str) -> Optional[Dict]:
+        """Look a paper up by its arXiv entry_id, in whichever topic it was stored."""
+        row = self._connect().execute(
+            "SELECT * FROM papers WHERE entry_id = ? LIMIT 1", (entry_id,)
+        ).fetchone()
+        return self._to_paper(row) if row else None
+
+    def _to_paper(self, row: sqlite3.Row) -> PaperRecord:
+        if "summary" in row.keys():
+            summary, summary_ref = row["summary"], None
+        else:
+            summary, summary_ref = None, (self._read_summary, row["rowid"])
+        return PaperRecord(row["entry_id"], row["title"], json.loads(row["authors"]), row["published"],
+                           row["pdf_url"], summary, summary_ref)
+
+    def migrate_from_json(self) -> int:
+        """Import the JSON backend's papers/<topic> folders once.
+
+        Returns:
+            Number of papers imported (0 if the migration already ran)
+        """
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return 0
+
+        imported = 0
+        json_store = JsonPaperStore(self.paper_dir)
+        for topic in json_store.list_topics():
+            try:
+                papers = json_store.get_papers(topic)
+            except json.JSONDecodeError:
+                # Leave corrupted files in place for manual inspection
+                continue
+            imported += self.add_papers(topic, papers)
+
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                         (str(time.time()),))
+        return imported
+
+
+def get_paper_store(paper_dir: str) -> PaperStore:
+    """Create the backend selected by PAPER_STORE ("sqlite" by default, "json" or "columnar")."""
+    backend = os.getenv("PAPER_STORE", "sqlite").lower()
+    if backend == "json":
+        return JsonPaperStore(paper_dir)
+    if backend == "columnar":
+        return ColumnarPaperStore(paper_dir)
+    if backend == "sqlite":
+        store = SqlitePaperStore(paper_dir)
+        store.migrate_from_json()
+        return store
+    raise ValueError(f"Unknown PAPER_STORE backend: {backend}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    paper_dir = sys.argv[1] if len(sys.argv) > 1 else "papers"
+    count = SqlitePaperStore(paper_dir).migrate_from_json()
+    print(f"Imported {count} papers from {paper_dir} into {os.path.join(paper_dir, DB_FILE)}")
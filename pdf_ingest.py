@@ -0,0 +1,297 @@
+"""
+Background PDF ingestion for the research server.
+
+Papers found by searches are queued for ingestion: their PDFs are downloaded
+by a few async workers fed from a bounded queue, and text extraction (the
+CPU-heavy part) runs in a process pool so it never blocks the stdio server
+loop. The extracted text is split into chunks tagged with the section they
+came from and stored per paper as two files under papers/_text:
+
+    <paper>.txt        UTF-8 text of all chunks back to back, read with mmap
+    <paper>.idx.json   sections, and the byte offset and length of each chunk
+
+so reading one chunk touches only that chunk's bytes.
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional
+
+try:
+    import pypdf
+except ImportError:
+    # Optional dependency: without it ingestion stays off
+    pypdf = None
+
+logger = logging.getLogger(__name__)
+
+TEXT_DIR = "_text"
+INDEX_SUFFIX = ".idx.json"
+TEXT_SUFFIX = ".txt"
+
+# Lines that look like section headings: "3 Method", "2.1. Training setup", "ABSTRACT", "References"
+KNOWN_SECTIONS = (
+    "abstract", "introduction", "related work", "background", "preliminaries", "method", "methods",
+    "methodology", "approach", "model", "experiments", "experimental setup", "results", "evaluation",
+    "discussion", "conclusion", "conclusions", "limitations", "future work", "acknowledgments",
+    "acknowledgements", "references", "appendix"
+)
+NUMBERED_HEADING = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+[A-Z][^.!?]{2,60}$")
+
+
+def paper_key(paper_id: str) -> str:
+    """File-name-safe key for an arXiv ID or abs URL, e.g. 2401.12345v1 or hep-th_9901001v1."""
+    short_id = paper_id.strip().rsplit("/abs/", 1)[-1].rsplit("/pdf/", 1)[-1]
+    return re.sub(r"[^A-Za-z0-9._-]", "_", short_id)
+
+
+def _section_heading(line: str) -> Optional[str]:
+    text = line.strip()
+    if not text or len(text) > 80:
+        return None
+    bare = re.sub(r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+", "", text).strip().rstrip(":")
+    if bare.lower() in KNOWN_SECTIONS or NUMBERED_HEADING.match(text):
+        return bare.title() if bare.isupper() else bare
+    return None
+
+
+def extract_chunks(pdf_bytes: bytes, chunk_chars: int) -> Dict:
+    """Extract a PDF's text and split it into section-tagged chunks.
+
+    Runs in a worker process, so it only takes and returns picklable values.
+
+    Returns:
+        {"pages": page count, "chunks": [[section title, text], ...]}
+    """
+    reader = pypdf.PdfReader(BytesIO(pdf_bytes))
+    chunks = []
+    section = "Front matter"
+    current = []
+    size = 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            chunks.append([section, "\n".join(current).strip()])
+        current, size = [], 0
+
+    for page in reader.pages:
+        for line in (page.extract_text() or "").splitlines():
+            heading = _section_heading(line)
+            if heading:
+                flush()
+                section = heading
+            # Split overlong lines so no chunk exceeds chunk_chars by much
+            while len(line) > chunk_chars:
+                flush()
+                chunks.append([section, line[:chunk_chars]])
+                line = line[chunk_chars:]
+            if size + len(line) > chunk_chars:
+                flush()
+            current.append(line)
+            size += len(line) + 1
+    flush()
+    return {"pages": len(reader.pages), "chunks": [c for c in chunks if c[1]]}
+
+
+class PaperTextStore:
+    """Chunked text of ingested papers, one .txt and one .idx.json file per paper."""
+
+    def __init__(self, text_dir: str):
+        self.text_dir = text_dir
+        os.makedirs(text_dir, exist_ok=True)
+
+    def _path(self, paper_id: str, suffix: str) -> str:
+        return os.path.join(self.text_dir, paper_key(paper_id) + suffix)
+
+    def has(self, paper_id: str) -> bool:
+        return os.path.exists(self._path(paper_id, INDEX_SUFFIX))
+
+    def write(self, paper_id: str, pdf_url: str, pages: int, chunks: List[List[str]]) -> Dict:
+        """Store a paper's chunks. The index is written last, so readers never see partial text."""
+        index = {"paper_id": paper_id, "pdf_url": pdf_url, "pages": pages, "sections": [], "chunks": []}
+        offset = 0
+        encoded = []
+        for section, text in chunks:
+            data = text.encode("utf-8")
+            if not index["sections"] or index["sections"][-1]["title"] != section:
+                index["sections"].append({"title": section, "first_chunk": len(index["chunks"]), "chunk_count": 0})
+            index["sections"][-1]["chunk_count"] += 1
+            index["chunks"].append([len(index["sections"]) - 1, offset, len(data)])
+            encoded.append(data)
+            offset += len(data)
+
+        for suffix, payload in ((TEXT_SUFFIX, b"".join(encoded)), (INDEX_SUFFIX, json.dumps(index).encode())):
+            path = self._path(paper_id, suffix)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        return index
+
+    def read_index(self, paper_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(paper_id, INDEX_SUFFIX), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def read_chunks(self, paper_id: str, chunk_numbers: List[int]) -> List[str]:
+        """Read the given chunks of a paper, mapping its text file instead of loading it."""
+        index = self.read_index(paper_id)
+        if index is None:
+            return []
+        with open(self._path(paper_id, TEXT_SUFFIX), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ["" for _ in chunk_numbers]
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as text:
+                result = []
+                for number in chunk_numbers:
+                    _, offset, length = index["chunks"][number]
+                    result.append(text[offset:offset + length].decode("utf-8"))
+                return result
+
+
+class PdfIngestor:
+    """Downloads and extracts queued papers in the background.
+
+    Args:
+        text_store: Where extracted text is written
+        queue_size: Papers that may wait for download; further submissions are dropped
+        downloads: Concurrent downloads
+        workers: Processes extracting text
+        chunk_chars: Target chunk size in characters
+        max_bytes: Largest PDF that will be downloaded
+    """
+
+    def __init__(self, text_store: PaperTextStore, queue_size: int = 100, downloads: int = 4,
+                 workers: int = 2, chunk_chars: int = 4000, max_bytes: int = 50 * 1024 * 1024,
+                 timeout: float = 60.0):
+        self.text_store = text_store
+        self.queue_size = queue_size
+        self.downloads = downloads
+        self.workers = workers
+        self.chunk_chars = chunk_chars
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.queue = None
+        self.tasks = []
+        self.pool = None
+        # paper key -> "queued", "downloading", "extracting" or "failed: <reason>"
+        self.status = {}
+        self.ingested = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the download workers on the running event loop (idempotent)."""
+        if self.queue is not None:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        # Spawned rather than forked: the server already runs threads (index build, to_thread workers)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.downloads)]
+
+    def submit(self, papers: List[Dict]) -> int:
+        """Queue papers that are not ingested or in progress yet, without waiting.
+
+        Returns:
+            Number of papers queued
+        """
+        self.start()
+        queued = 0
+        for paper in papers:
+            key = paper_key(paper["entry_id"])
+            if not paper.get("pdf_url") or self.text_store.has(key):
+                continue
+            state = self.status.get(key)
+            if state is not None and not state.startswith("failed"):
+                # Already queued or in progress; failed papers are retried
+                continue
+            try:
+                self.queue.put_nowait(paper)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                continue
+            self.status[key] = "queued"
+            queued += 1
+        return queued
+
+    def state(self, paper_id: str) -> Optional[str]:
+        """"ingested", an in-progress or failed status, or None if the paper was never queued."""
+        key = paper_key(paper_id)
+        if self.text_store.has(key):
+            return "ingested"
+        return self.status.get(key)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            paper = await self.queue.get()
+            key = paper_key(paper["entry_id"])
+            try:
+                self.status[key] = "downloading"
+                pdf_bytes = await asyncio.to_thread(self._download, paper["pdf_url"])
+                self.status[key] = "extracting"
+                extracted = await loop.run_in_executor(self.pool, extract_chunks, pdf_bytes, self.chunk_chars)
+                await asyncio.to_thread(
+                    self.text_store.write, key, paper["pdf_url"], extracted["pages"], extracted["chunks"]
+                )
+                self.status.pop(key, None)
+                self.ingested += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("could not ingest %s: %s", paper["pdf_url"], e)
+                self.status[key] = f"failed: {type(e).__name__}: {e}"
+                self.failed += 1
+            finally:
+                self.queue.task_done()
+
+    def _download(self, url: str) -> bytes:
+        request = urllib.request.Request(url, headers={"User-Agent": "mcp-research-assistant"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = response.read(self.max_bytes + 1)
+        if len(data) > self.max_bytes:
+            raise ValueError(f"PDF larger than {self.max_bytes} bytes")
+        return data
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self.queue.qsize() if self.queue else 0,
+            "in_progress": sum(1 for s in self.status.values() if s in ("downloading", "extracting")),
+            "ingested": self.ingested,
+            "failed": self.failed,
+            "dropped": self.dropped
+        }
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.pool:
+            self.pool.shutdown(cancel_futures=True)
+
+
+def get_pdf_ingestor(paper_dir: str) -> Optional[PdfIngestor]:
+    """Create the ingestor if PDF_INGEST=1 and pypdf is installed, else None."""
+    if os.getenv("PDF_INGEST", "0") != "1":
+        return None
+    if pypdf is None:
+        logger.warning("PDF_INGEST is set but pypdf is not installed; PDF ingestion is off")
+        return None
+    return PdfIngestor(
+        PaperTextStore(os.path.join(paper_dir, TEXT_DIR)),
+        queue_size=int(os.getenv("PDF_QUEUE_SIZE", "100")),
+        downloads=int(os.getenv("PDF_DOWNLOADS", "4")),
+        workers=int(os.getenv("PDF_WORKERS", "2")),
+        chunk_chars=int(os.getenv("PDF_CHUNK_CHARS", "4000"))
+    )
@@ -0,0 +1,85 @@
+"""
+Token-bucket rate limiting for calls to rate-limited upstream APIs.
+
+TokenBucket does the accounting: tokens refill at ``rate`` per second up to
+``capacity`` and callers ask how long until they can take some.
+AsyncRateLimiter wraps one for code that just needs to wait its turn: callers
+await acquire() before each request and wait in arrival order, so one limiter
+shared by every task keeps the whole process under the upstream's limit no
+matter how many requests are in flight.
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Refilling token budget. A rate of 0 means unlimited."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        if not self.rate:
+            return float("inf")
+        self._refill()
+        return self.tokens
+
+    def time_until(self, tokens: float) -> float:
+        """Seconds until ``tokens`` can be taken (requests above capacity only wait for a full bucket)."""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        missing = min(tokens, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, tokens: float):
+        """Spend tokens; the balance may go negative, which delays later callers."""
+        if self.rate:
+            self._refill()
+            self.tokens -= min(tokens, self.capacity)
+
+    def give_back(self, tokens: float):
+        """Return unused tokens (or, if negative, charge for extra ones)."""
+        if self.rate:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+
+class AsyncRateLimiter:
+    """Token bucket shared by all tasks of one event loop. A rate of 0 disables limiting."""
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.bucket = TokenBucket(rate, burst)
+        # Waiters queue on the lock, so tokens are handed out first come, first served
+        self.lock = asyncio.Lock()
+        self.acquired = 0
+        self.waited = 0.0
+
+    @classmethod
+    def per_interval(cls, seconds: float) -> "AsyncRateLimiter":
+        """One request every ``seconds`` seconds (0 for no limit)."""
+        return cls(rate=1 / seconds if seconds > 0 else 0, burst=1)
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until ``tokens`` tokens are available and take them."""
+        self.acquired += 1
+        if not self.bucket.rate:
+            return
+        async with self.lock:
+            delay = self.bucket.time_until(tokens)
+            if delay > 0:
+                self.waited += delay
+                await asyncio.sleep(delay)
+            self.bucket.take(tokens)
+
+    def stats(self):
+        return {"acquired": self.acquired, "waited_seconds": round(self.waited, 3)}
@@ -1,17 +1,94 @@
 import arxiv
+import asyncio
 import json
 import os
-from typing import List
-from mcp.server.fastmcp import FastMCP
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from mcp.server.fastmcp import Context, FastMCP
+from paper_store import get_paper_store, topic_key
+from pdf_ingest import get_pdf_ingestor
+from rate_limit import AsyncRateLimiter
+from search_cache import AsyncTTLCache, VersionedLRUCache
+from search_index import BM25Index
+from tracing import get_tracer
 
 PAPER_DIR = "papers"
 
+# The tracer, store and PDF ingestor are set up by init_server() when the server
+# starts, not on import: PDF extraction workers are spawned processes that
+# re-import this module as __mp_main__, and must not open and migrate the
+# store, start exporters or index papers again
+
+# Spans for tool calls, arXiv fetches and store I/O, joined to the chatbot's
+# trace through the correlation ID it sends with each tool call
+tracer = None
+
+# Paper storage backend (SQLite by default, see PAPER_STORE)
+store = None
+
+# Downloads and extracts the PDFs of papers found by searches (None unless PDF_INGEST=1)
+pdf_ingestor = None
+
+# Largest amount of paper text one read_paper call returns
+READ_MAX_CHARS = int(os.getenv("READ_PAPER_MAX_CHARS", "12000"))
+
+# Full-text index over everything in the store, for offline search_local queries
+search_index = BM25Index()
+
+# arXiv asks for at least 3 seconds between requests; ARXIV_API_URL points
+# searches at a stand-in such as benchmarks/fake_arxiv_server.py
+ARXIV_DELAY_SECONDS = float(os.getenv("ARXIV_DELAY_SECONDS", "3"))
+ARXIV_API_URL = os.getenv("ARXIV_API_URL")
+# Papers per arXiv request (arXiv's own page size)
+ARXIV_PAGE_SIZE = 100
+
+# Large searches first fetch this many papers in a small request of their own,
+# so the first results are stored and reported quickly; the rest follow in full pages
+FIRST_PAGE_SIZE = int(os.getenv("SEARCH_FIRST_PAGE", "10"))
+
+# Every arXiv request, from any search, first waits for this limiter, so
+# concurrent searches (several tool calls, or a batch) and the pages of
+# one search are all spaced ARXIV_DELAY_SECONDS apart
+arxiv_limiter = AsyncRateLimiter.per_interval(ARXIV_DELAY_SECONDS)
+
+# arXiv clients not in use by a fetch right now, kept for their open connections
+_idle_arxiv_clients: List[arxiv.Client] = []
+_idle_arxiv_clients_lock = threading.Lock()
+
+# Most topics one search_papers_batch call may ask for
+MAX_BATCH_TOPICS = int(os.getenv("SEARCH_BATCH_MAX_TOPICS", "20"))
+
+# Papers are stored and reported to the client in batches of this size as they arrive
+STORE_BATCH_SIZE = int(os.getenv("SEARCH_STORE_BATCH", "10"))
+# Longest a fetch thread waits for a progress notification to be sent
+PROGRESS_TIMEOUT = 5.0
+
+# Cache of arXiv results, keyed by normalized query, max_results and sort order
+search_cache = AsyncTTLCache(
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "3600")),
+    stale_ttl=float(os.getenv("SEARCH_CACHE_STALE_TTL", "86400")),
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+)
+
+# Rendered papers://{topic} pages, rebuilt when the topic's stored papers change
+page_cache = VersionedLRUCache(max_entries=int(os.getenv("PAGE_CACHE_SIZE", "256")))
+
+# Papers per page of papers://{topic}, and the largest page a client may ask for
+PAGE_SIZE = int(os.getenv("PAPERS_PAGE_SIZE", "10"))
+MAX_PAGE_SIZE = 100
+
+# Fields papers://{topic} pages can show; "titles" and "full" are shorthands
+PAPER_FIELDS = ("title", "entry_id", "authors", "published", "pdf_url", "summary")
+FIELD_SETS = {"full": PAPER_FIELDS, "titles": ("title", "entry_id")}
+NEXT_PAGE_PREFIX = "Next page: "
+
 # Initialize FastMCP server
 mcp = FastMCP("research")
 
 
 @mcp.tool()
-def search_papers(topic: str, max_results: int = 5) -> List[str]:
+async def search_papers(topic: str, max_results: int = 5, ctx: Context = None) -> List[str]:
     """
     Search for papers on arXiv based on a topic and store their information.
     
@@ -22,45 +99,404 @@ def search_papers(topic: str, max_results: int = 5) -> List[str]:
     Returns:
         List of paper IDs found in the search
     """
-    # Use arxiv to find the papers
-    client = arxiv.Client()
+    with request_span(ctx, "search_papers", topic=topic, max_results=max_results):
+        # Papers are stored and reported as progress while they arrive
+        papers_data, _ = await search_and_store(topic, max_results, ctx)
+        return [paper_info["entry_id"] for paper_info in papers_data]
+
+
+@mcp.tool()
+async def search_papers_batch(topics: List[str], max_results: int = 5, ctx: Context = None) -> Dict[str, Dict]:
+    """
+    Search arXiv for several topics at once and store the papers found for each.
     
+    Prefer this over several search_papers calls when a question spans related topics.
+    
+    Args:
+        topics: The topics to search for (at most 20; duplicates are searched once)
+        max_results: Maximum number of results to retrieve per topic (default: 5)
+    
+    Returns:
+        For each topic, either {"found", "new", "paper_ids"} or {"error"} if that topic's search failed
+    """
+    with request_span(ctx, "search_papers_batch", topics=len(topics), max_results=max_results) as span:
+        # Topics that differ only in case or spacing are the same search
+        unique = {}
+        for topic in topics:
+            unique.setdefault(normalize_query(topic), topic)
+        if len(unique) > MAX_BATCH_TOPICS:
+            raise ValueError(f"At most {MAX_BATCH_TOPICS} topics per batch, got {len(unique)}")
+        
+        done = 0
+        
+        async def search_topic(topic):
+            nonlocal done
+            try:
+                result = await search_and_store(topic, max_results)
+            except Exception as e:
+                result = e
+            done += 1
+            await report_progress(ctx, done, len(unique), f"Searched {done} of {len(unique)} topics")
+            return result
+        
+        # All topics are fetched at once; arxiv_limiter keeps the requests within arXiv's rate limit
+        results = await asyncio.gather(
+            *(search_topic(topic) for topic in unique.values()),
+            return_exceptions=True
+        )
+        
+        summary = {}
+        for topic, result in zip(unique.values(), results):
+            if isinstance(result, BaseException):
+                summary[topic] = {"error": f"{type(result).__name__}: {result}"}
+            else:
+                papers_data, added = result
+                summary[topic] = {
+                    "found": len(papers_data),
+                    "new": added,
+                    "paper_ids": [paper_info["entry_id"] for paper_info in papers_data]
+                }
+        failed = sum(1 for result in summary.values() if "error" in result)
+        span.set(failed=failed)
+        if failed:
+            span.fail(f"{failed} of {len(summary)} topics failed")
+        return summary
+
+
+async def search_and_store(topic: str, max_results: int, ctx: Context = None):
+    """Search arXiv for a topic (through the cache) and merge the results into the store.
+    
+    Papers fetched from arXiv are stored in batches as they arrive, and each
+    batch is reported to the client as a progress notification when ctx is given.
+    
+    Returns:
+        The papers found and how many of them were new to the topic
+    """
     # Search for the most relevant articles matching the queried topic
-    search = arxiv.Search(
-        query=topic,
-        max_results=max_results,
-        sort_by=arxiv.SortCriterion.Relevance
+    query = normalize_query(topic)
+    sort_by = arxiv.SortCriterion.Relevance
+    loop = asyncio.get_running_loop()
+    progress = {"found": 0, "added": 0}
+    
+    def store_batch(batch: List[Dict]):
+        # Runs in the fetch thread, so later pages download while this one is written
+        with tracer.span("store_write", topic=topic, incremental=True) as write_span:
+            added = store.add_papers(topic, batch)
+            write_span.set(papers=len(batch), added=added)
+        search_index.add_papers(topic_key(topic), batch)
+        progress["found"] += len(batch)
+        progress["added"] += added
+        if ctx is None:
+            return
+        message = f"Found {progress['found']} of up to {max_results} papers on {topic} ({progress['added']} new)"
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                report_progress(ctx, progress["found"], max_results, message), loop
+            )
+            future.result(timeout=PROGRESS_TIMEOUT)
+        except Exception:
+            # The caller may be gone while a shared fetch carries on
+            pass
+    
+    # Repeated and concurrent identical searches share one arXiv request.
+    # arXiv requests and store writes block, so run them off the event loop;
+    # this lets the server work on several tool calls from one turn at once
+    papers_data = await search_cache.get(
+        (query, max_results, sort_by.value),
+        lambda: fetch_papers(query, max_results, sort_by, on_batch=store_batch)
     )
     
-    papers = client.results(search)
+    # Merge into the topic: papers found by earlier searches are kept and
+    # already-stored papers are not rewritten. Papers stored while they arrived
+    # are skipped here; results from the cache or a shared fetch are written now
+    with tracer.span("store_write", topic=topic) as write_span:
+        added = progress["added"] + await asyncio.to_thread(store.add_papers, topic, papers_data)
+        write_span.set(papers=len(papers_data), added=added)
+    with tracer.span("index_update"):
+        await asyncio.to_thread(search_index.add_papers, topic_key(topic), papers_data)
+    
+    if pdf_ingestor:
+        # Full texts are fetched in the background; read_paper serves them once ready
+        pdf_ingestor.submit(papers_data)
+    
+    return papers_data, added
+
+
+async def fetch_papers(query: str, max_results: int, sort_by: arxiv.SortCriterion,
+                       on_batch: Optional[Callable[[List[Dict]], None]] = None) -> List[Dict]:
+    """Fetch papers from arXiv one page (one request) at a time.
+    
+    Each page waits for the shared rate limiter here on the event loop and only
+    then takes a worker thread, so searches queued behind the limiter don't hold
+    threads that store writes, index updates and PDF downloads need.
+    
+    Cancelling the fetch stops it before its next paper or page; the thread
+    can't be interrupted in the middle of one HTTP request.
+    
+    Args:
+        on_batch: Called from the worker thread with every STORE_BATCH_SIZE papers as they
+            arrive, and with the last few of each page
+    """
+    stop = threading.Event()
+    papers_data = []
+    seen = set()
+    with tracer.span("arxiv_fetch", query=query, max_results=max_results) as span:
+        # A small first request gets the first papers out quickly, then the rest follow
+        page_size = FIRST_PAGE_SIZE if on_batch and max_results > FIRST_PAGE_SIZE > 0 else ARXIV_PAGE_SIZE
+        offset = 0
+        try:
+            while offset < max_results:
+                page_size = min(page_size, max_results - offset)
+                with tracer.span("arxiv_wait"):
+                    await arxiv_limiter.acquire()
+                received, papers = await asyncio.to_thread(
+                    _fetch_page, query, sort_by, offset, page_size, seen, on_batch, stop
+                )
+                papers_data.extend(papers)
+                if received < page_size:
+                    # arXiv ran out of papers before the end of this page; there is no next one
+                    break
+                offset += page_size
+                page_size = ARXIV_PAGE_SIZE
+        except asyncio.CancelledError:
+            stop.set()
+            span.set(papers=len(papers_data), stopped=True)
+            raise
+        span.set(papers=len(papers_data))
+        return papers_data
+
+
+async def report_progress(ctx: Optional[Context], progress: float, total: float, message: str):
+    """Send a progress notification for the current request, if the client asked for them."""
+    if ctx is None:
+        return
+    try:
+        await ctx.report_progress(progress, total, message)
+    except Exception:
+        # Progress is best effort; the request itself carries on
+        pass
+
+
+@mcp.tool()
+async def search_local(query: str, max_results: int = 10, ctx: Context = None) -> List[Dict]:
+    """
+    Search papers that are already stored locally, without contacting arXiv.
+    
+    Matches the query against titles, authors and summaries and ranks results with BM25.
+    Use this first to check what has already been found on a subject.
     
-    # Store paper information
-    paper_ids = []
+    Args:
+        query: Free-text search terms
+        max_results: Maximum number of matches to return (default: 10)
     
-    # Create directory for this topic if it doesn't exist
-    topic_dir = os.path.join(PAPER_DIR, topic.lower().replace(" ", "_"))
-    os.makedirs(topic_dir, exist_ok=True)
+    Returns:
+        Matching papers, best first, with entry_id, title, authors, published, topics and score
+    """
+    with request_span(ctx, "search_local", query=query) as span:
+        search_index.start_build(store)
+        if not search_index.ready.is_set():
+            # First query after startup: wait for the background build to finish
+            span.set(waited_for_index=True)
+            await asyncio.to_thread(search_index.ready.wait)
+        return search_index.search(query, limit=max_results)
+
+
+@mcp.tool()
+async def read_paper(paper_id: str, section: str = "", chunk: int = -1, ctx: Context = None) -> str:
+    """
+    Read the full text of a stored paper, one section or chunk at a time.
+    
+    Call with just paper_id to get the paper's table of contents, then ask for a
+    section by title or a chunk by number. Full texts are downloaded in the
+    background after search_papers finds a paper, so a new paper may take a
+    minute to become readable.
+    
+    Args:
+        paper_id: arXiv ID (e.g. 2401.12345v1) or entry_id URL of the paper
+        section: Section title to read, case-insensitive; a partial title is enough
+        chunk: Number of the chunk to read, from the table of contents
+    
+    Returns:
+        The table of contents, or the requested text. A paper whose text is not
+        ready yet is an error saying whether to try again shortly
+    """
+    with request_span(ctx, "read_paper", paper_id=paper_id, section=section, chunk=chunk):
+        if pdf_ingestor is None:
+            return "Full-text reading is turned off (set PDF_INGEST=1 and install pypdf)."
+        
+        text_store = pdf_ingestor.text_store
+        index = await asyncio.to_thread(text_store.read_index, paper_id)
+        if index is None:
+            await _queue_for_reading(paper_id)
+        
+        chunk_count = len(index["chunks"])
+        if chunk >= 0:
+            if chunk >= chunk_count:
+                return f"Chunk {chunk} does not exist; {paper_id} has chunks 0-{chunk_count - 1}."
+            numbers = [chunk]
+        elif section:
+            wanted = section.strip().lower()
+            matches = [s for s in index["sections"] if s["title"].lower() == wanted] or \
+                      [s for s in index["sections"] if wanted in s["title"].lower()]
+            if not matches:
+                return f"No section matching '{section}'.\n\n" + _table_of_contents(index)
+            first = matches[0]
+            numbers = list(range(first["first_chunk"], first["first_chunk"] + first["chunk_count"]))
+        else:
+            return _table_of_contents(index)
+        
+        texts = await asyncio.to_thread(text_store.read_chunks, paper_id, numbers)
+        parts = []
+        used = 0
+        for number, text in zip(numbers, texts):
+            if parts and used + len(text) > READ_MAX_CHARS:
+                parts.append(f"[Section continues: read chunk={number} next]")
+                break
+            title = index["sections"][index["chunks"][number][0]]["title"]
+            parts.append(f"[Chunk {number} of {chunk_count}, section: {title}]\n{text[:READ_MAX_CHARS]}")
+            used += len(text)
+        return "\n\n".join(parts)
+
+
+def _table_of_contents(index: Dict) -> str:
+    lines = [f"{index['paper_id']}: {index['pages']} pages, {len(index['chunks'])} chunks", "Sections:"]
+    for section in index["sections"]:
+        first, count = section["first_chunk"], section["chunk_count"]
+        chunks = f"chunk {first}" if count == 1 else f"chunks {first}-{first + count - 1}"
+        lines.append(f"- {section['title']} ({chunks})")
+    return "\n".join(lines)
+
+
+async def _queue_for_reading(paper_id: str):
+    """Raise an error saying why a paper has no text yet, queueing it if it is stored but was never ingested.
+    
+    These answers are errors rather than results, so clients don't keep a
+    "try again shortly" as the paper's text.
+    """
+    state = pdf_ingestor.state(paper_id)
+    if state and state.startswith("failed"):
+        raise RuntimeError(f"Could not read {paper_id}: {state[len('failed: '):]}")
+    if state:
+        raise RuntimeError(f"{paper_id} is being ingested ({state}); try again shortly.")
+    
+    # Older papers were stored before ingestion was turned on
+    paper = await asyncio.to_thread(store.find_paper, paper_id)
+    if paper is None and "/abs/" not in paper_id:
+        paper = await asyncio.to_thread(store.find_paper, f"http://arxiv.org/abs/{paper_id}")
+    if paper is None:
+        raise ValueError(f"Paper {paper_id} is not stored. Find it with search_papers first.")
+    if not pdf_ingestor.submit([paper]):
+        raise RuntimeError(f"The ingestion queue is full; try {paper_id} again later.")
+    raise RuntimeError(f"{paper_id} has been queued for ingestion; try again shortly.")
+
+
+def request_span(ctx: Context, name: str, **attributes):
+    """Span for one MCP request, joining the client's trace if it sent a correlation ID."""
+    meta = ctx.request_context.meta if ctx is not None else None
+    return tracer.span(
+        name,
+        trace_id=getattr(meta, "correlation_id", None),
+        parent_id=getattr(meta, "parent_span_id", None),
+        **attributes
+    )
+
+
+def normalize_query(topic: str) -> str:
+    """Collapse case and whitespace so equivalent searches share a cache entry."""
+    return " ".join(topic.lower().split())
+
+
+def _fetch_page(query: str, sort_by: arxiv.SortCriterion, offset: int, page_size: int, seen: set,
+                on_batch: Optional[Callable[[List[Dict]], None]], stop: threading.Event) -> Tuple[int, List[Dict]]:
+    """Fetch one page of results in a single arXiv request.
+    
+    Returns:
+        How many results arXiv returned, and the papers among them not in seen (which is updated)
+    """
+    search = arxiv.Search(
+        query=query,
+        max_results=offset + page_size,
+        sort_by=sort_by
+    )
     
     # Collect paper data
+    received = 0
     papers_data = []
-    for paper in papers:
-        paper_info = {
-            "title": paper.title,
-            "authors": [author.name for author in paper.authors],
-            "summary": paper.summary,
-            "pdf_url": paper.pdf_url,
-            "published": paper.published.isoformat(),
-            "entry_id": paper.entry_id
-        }
-        papers_data.append(paper_info)
-        paper_ids.append(paper.entry_id)
-    
-    # Save papers info to JSON file
-    papers_file = os.path.join(topic_dir, "papers_info.json")
-    with open(papers_file, 'w') as f:
-        json.dump(papers_data, f, indent=2)
-    
-    return paper_ids
+    batch = []
+    with _arxiv_client(page_size) as client:
+        for paper in client.results(search, offset=offset):
+            if stop.is_set():
+                break
+            received += 1
+            if paper.entry_id in seen:
+                continue
+            seen.add(paper.entry_id)
+            paper_info = {
+                "title": paper.title,
+                "authors": [author.name for author in paper.authors],
+                "summary": paper.summary,
+                "pdf_url": paper.pdf_url,
+                "published": paper.published.isoformat(),
+                "entry_id": paper.entry_id
+            }
+            papers_data.append(paper_info)
+            batch.append(paper_info)
+            if on_batch and len(batch) >= STORE_BATCH_SIZE:
+                on_batch(batch)
+                batch = []
+    if on_batch and batch and not stop.is_set():
+        on_batch(batch)
+    return received, papers_data
+
+
+@contextmanager
+def _arxiv_client(page_size: int):
+    """Borrow an idle arXiv client, or make one if all are in use, and set its page size.
+    
+    Clients are kept and reused so each one's HTTP connection stays open
+    between requests instead of being set up again for every page.
+    """
+    with _idle_arxiv_clients_lock:
+        client = _idle_arxiv_clients.pop() if _idle_arxiv_clients else None
+    if client is None:
+        # Requests are paced by arxiv_limiter, so the client adds no delay of its own
+        client = arxiv.Client(delay_seconds=0)
+        if ARXIV_API_URL:
+            client.query_url_format = ARXIV_API_URL + "?{}"
+    # One request per page: a client whose page holds the whole request never
+    # asks arXiv for a second page on its own
+    client.page_size = page_size
+    try:
+        yield client
+    finally:
+        with _idle_arxiv_clients_lock:
+            _idle_arxiv_clients.append(client)
+
+
+@mcp.resource("stats://search-cache")
+def get_search_cache_stats() -> str:
+    """
+    Hit and miss counts of the arXiv search cache and time spent waiting for the arXiv rate limit, as JSON.
+    """
+    return json.dumps(dict(search_cache.stats(), arxiv_rate_limit=arxiv_limiter.stats()), indent=2)
+
+
+@mcp.resource("stats://page-cache")
+def get_page_cache_stats() -> str:
+    """
+    Hit, miss and invalidation counts of the rendered papers page cache, as JSON.
+    """
+    return json.dumps(page_cache.stats(), indent=2)
+
+
+@mcp.resource("stats://pdf-ingest")
+def get_pdf_ingest_stats() -> str:
+    """
+    Queue length and ingested/failed/dropped counts of the PDF ingestion pipeline, as JSON.
+    """
+    if pdf_ingestor is None:
+        return json.dumps({"enabled": False})
+    return json.dumps(dict(pdf_ingestor.stats(), enabled=True), indent=2)
 
 
 @mcp.resource("papers://folders")
@@ -68,24 +504,24 @@ def get_available_folders() -> str:
     """
     List all available topic folders in the papers directory.
     
-    This resource provides a simple list of all available topic folders.
+    This resource provides a simple list of all available topic folders and how many papers each holds.
     """
-    folders = []
-    
-    # Get all topic directories
-    if os.path.exists(PAPER_DIR):
-        for topic_dir in os.listdir(PAPER_DIR):
-            topic_path = os.path.join(PAPER_DIR, topic_dir)
-            if os.path.isdir(topic_path):
-                papers_file = os.path.join(topic_path, "papers_info.json")
-                if os.path.exists(papers_file):
-                    folders.append(topic_dir)
+    with tracer.span("resource_folders") as span:
+        hits = page_cache.hits
+        # Rebuilt only when a topic is created or written to
+        content = page_cache.get(("folders",), store.catalog_version(), _render_folders)
+        span.set(cached=page_cache.hits > hits)
+    return content
+
+
+def _render_folders() -> str:
+    counts = store.topic_counts()
     
     # Create a simple markdown list
     content = "# Available Topics\n\n"
-    if folders:
-        for folder in folders:
-            content += f"- {folder}\n"
+    if counts:
+        for folder in sorted(counts):
+            content += f"- {folder} ({counts[folder]} papers)\n"
             content += f"  Use @{folder} to access papers in that topic.\n"
     else:
         content += "No topics found.\n"
@@ -98,34 +534,93 @@ def get_topic_papers(topic: str) -> str:
     """
     Get detailed information about papers on a specific topic.
     
+    Shows the first page; see papers://{topic}/page/{page}/size/{size}/fields/{fields} for the rest.
+    
     Args:
         topic: The research topic to retrieve papers for
     """
-    topic_dir = topic.lower().replace(" ", "_")
-    papers_file = os.path.join(PAPER_DIR, topic_dir, "papers_info.json")
-    
-    if not os.path.exists(papers_file):
-        return f"# No papers found for topic: {topic}\n\nTry searching for papers on this topic first."
+    return render_topic_page(topic, 1, PAGE_SIZE, "full")
+
+
+@mcp.resource("papers://{topic}/page/{page}/size/{size}/fields/{fields}")
+def get_topic_papers_page(topic: str, page: str, size: str, fields: str) -> str:
+    """
+    Get one page of the papers on a specific topic.
     
+    Args:
+        topic: The research topic to retrieve papers for
+        page: Page number, starting at 1
+        size: Papers per page (at most 100)
+        fields: "full", "titles", or a comma-separated list of title, entry_id,
+            authors, published, pdf_url and summary
+    """
     try:
-        with open(papers_file, 'r') as f:
-            papers_data = json.load(f)
-        
-        # Create markdown content with paper details
-        content = f"# Papers on {topic.replace('_', ' ').title()}\n\n"
-        content += f"Total papers: {len(papers_data)}\n\n"
-        
-        for paper_info in papers_data:
-            content += f"## {paper_info['title']}\n"
-            content += f"- **Paper ID**: {paper_info['entry_id']}\n"
-            content += f"- **Authors**: {', '.join(paper_info['authors'])}\n"
-            content += f"- **Published**: {paper_info['published']}\n"
-            content += f"- **PDF URL**: {paper_info['pdf_url']}\n\n"
-            content += f"### Summary\n{paper_info['summary'][:500]}...\n\n"
+        page_number = int(page)
+        page_size = int(size)
+    except ValueError:
+        return f"# Invalid page\n\nPage and size must be numbers, got page={page} size={size}."
+    if page_number < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+        return f"# Invalid page\n\nPage must be at least 1 and size between 1 and {MAX_PAGE_SIZE}."
+    unknown = [f for f in fields.split(",") if f not in PAPER_FIELDS] if fields not in FIELD_SETS else []
+    if unknown:
+        return f"# Invalid fields\n\nUnknown fields: {', '.join(unknown)}. Use full, titles or any of {', '.join(PAPER_FIELDS)}."
+    return render_topic_page(topic, page_number, page_size, fields)
+
+
+def render_topic_page(topic: str, page: int, size: int, fields: str) -> str:
+    """Render a page of a topic as markdown, reusing the cached copy while the topic is unchanged."""
+    with tracer.span("resource_topic", topic=topic, page=page, size=size, fields=fields) as span:
+        version = store.topic_version(topic)
+        if version is None:
+            return f"# No papers found for topic: {topic}\n\nTry searching for papers on this topic first."
         
+        hits = page_cache.hits
+        try:
+            content = page_cache.get(
+                (topic_key(topic), page, size, fields), version,
+                lambda: _render_topic_page(topic, page, size, fields)
+            )
+        except json.JSONDecodeError:
+            return f"# Error reading papers data for {topic}\n\nThe papers data file is corrupted."
+        span.set(cached=page_cache.hits > hits)
         return content
-    except json.JSONDecodeError:
-        return f"# Error reading papers data for {topic}\n\nThe papers data file is corrupted."
+
+
+def _render_topic_page(topic: str, page: int, size: int, fields: str) -> str:
+    selected = FIELD_SETS.get(fields) or tuple(fields.split(","))
+    # Summaries stay on disk unless the page shows them
+    papers_data, total = store.get_papers_page(topic, (page - 1) * size, size, fields=selected)
+    pages = max(1, -(-total // size))
+    first = (page - 1) * size + 1
+    
+    # Create markdown content with paper details
+    parts = [f"# Papers on {topic.replace('_', ' ').title()}\n\n"]
+    if papers_data:
+        parts.append(f"Total papers: {total} (showing {first}-{first + len(papers_data) - 1}, page {page} of {pages})\n\n")
+    else:
+        parts.append(f"Total papers: {total} (page {page} of {pages} is empty)\n\n")
+    
+    for paper_info in papers_data:
+        if selected == FIELD_SETS["titles"]:
+            parts.append(f"- {paper_info['title']} ({paper_info['entry_id']})\n")
+            continue
+        parts.append(f"## {paper_info['title']}\n" if "title" in selected else "## Paper\n")
+        if "entry_id" in selected:
+            parts.append(f"- **Paper ID**: {paper_info['entry_id']}\n")
+        if "authors" in selected:
+            parts.append(f"- **Authors**: {', '.join(paper_info['authors'])}\n")
+        if "published" in selected:
+            parts.append(f"- **Published**: {paper_info['published']}\n")
+        if "pdf_url" in selected:
+            parts.append(f"- **PDF URL**: {paper_info['pdf_url']}\n")
+        parts.append("\n")
+        if "summary" in selected:
+            parts.append(f"### Summary\n{paper_info['summary'][:500]}...\n\n")
+    
+    if page < pages:
+        # Clients look for this last line to offer the next page
+        parts.append(f"\n{NEXT_PAGE_PREFIX}papers://{topic}/page/{page + 1}/size/{size}/fields/{fields}\n")
+    return "".join(parts)
 
 
 @mcp.prompt()
@@ -161,6 +656,32 @@ Follow these instructions:
 Please present detailed information about each paper and a high-level summary at the end."""
 
 
+def init_server():
+    """Set up the tracer, paper store and PDF ingestor, and start indexing stored papers. Runs once."""
+    global tracer, store, pdf_ingestor
+    if store is not None:
+        return
+    tracer = get_tracer("research_server")
+    store = get_paper_store(PAPER_DIR)
+    pdf_ingestor = get_pdf_ingestor(PAPER_DIR)
+    # Index stored papers in the background so search_local is ready early
+    search_index.start_build(store)
+
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="MCP research server")
+    parser.add_argument("--transport", default=os.getenv("MCP_TRANSPORT", "stdio"),
+                        choices=["stdio", "streamable-http", "sse"],
+                        help="stdio for one client, or a network transport shared by many chatbot processes")
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8000")))
+    args = parser.parse_args()
+    
+    init_server()
+    
     # Initialize and run the server
-    mcp.run(transport="stdio")
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    mcp.run(transport=args.transport)
@@ -0,0 +1,182 @@
+"""
+In-process caches used by the research server.
+
+AsyncTTLCache caches upstream searches.
+
+Entries are fresh for ``ttl`` seconds. For a further ``stale_ttl`` seconds
+they are still served, while a background refresh fetches a new copy
+(stale-while-revalidate). Concurrent requests for the same key share one
+upstream fetch, which is cancelled if every request waiting on it is, and
+the least recently used entries are evicted once ``max_entries`` is reached.
+
+VersionedLRUCache caches values derived from stored data, such as rendered
+resource pages. Each entry remembers the version of the data it was built
+from and is rebuilt once the caller sees a different version.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class AsyncTTLCache:
+    """Size-bounded LRU cache with TTL, stale-while-revalidate and request coalescing."""
+
+    def __init__(self, ttl: float = 3600, stale_ttl: float = 86400, max_entries: int = 1024):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        # key -> (value, stored_at), oldest use first
+        self.entries = OrderedDict()
+        # key -> task fetching that key right now
+        self.in_flight = {}
+        # key -> callers awaiting its in-flight fetch
+        self.waiters = {}
+        # Background refreshes, which run on even with nobody waiting
+        self.detached = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+        self.abandoned = 0
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, calling fetch() when it is missing or expired.
+
+        Args:
+            key: Cache key, already normalized by the caller
+            fetch: Coroutine factory that fetches a fresh value
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                # Serve the old copy now and refresh it in the background
+                self.stale_hits += 1
+                self.entries.move_to_end(key)
+                task = self._refresh(key, fetch)
+                self.detached.add(task)
+                task.add_done_callback(self.detached.discard)
+                return value
+
+        self.misses += 1
+        task = self._refresh(key, fetch)
+        self.waiters[key] = self.waiters.get(key, 0) + 1
+        try:
+            # Shielded so one cancelled caller doesn't cancel a fetch others are waiting on
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.waiters[key] == 1 and task not in self.detached and not task.done():
+                # The last caller gave up: stop the upstream fetch instead of finishing it for nobody
+                self.abandoned += 1
+                task.cancel()
+            raise
+        finally:
+            self.waiters[key] -= 1
+            if not self.waiters[key]:
+                del self.waiters[key]
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        task = asyncio.create_task(self._fetch(key, fetch))
+        self.in_flight[key] = task
+        # Background refreshes may fail with nobody awaiting them
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight.pop(key, None)
+        self.put(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a fresh value, evicting the least recently used entries if full."""
+        self.entries[key] = (value, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for sizing the cache."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "abandoned": self.abandoned,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0
+        }
+
+
+class VersionedLRUCache:
+    """Size-bounded LRU cache whose entries are valid for one version of their source data."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        # key -> (version, value), oldest use first
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], Any]) -> Any:
+        """Return the value cached for key at this version, calling build() otherwise.
+
+        Args:
+            key: Cache key
+            version: Current version of the data the value is built from
+            build: Function that builds the value from the current data
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[1]
+            if entry is not None:
+                self.invalidations += 1
+            self.misses += 1
+
+        value = build()
+        with self.lock:
+            self.entries[key] = (version, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,144 @@
+"""
+In-memory BM25 full-text index over stored papers.
+
+Titles, authors and summaries of every paper in the paper store are
+tokenized into an inverted index that is built once in the background when
+the server starts. It is then kept up to date as search_papers stores new
+papers, so local searches never touch the network.
+"""
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List
+
+from paper_records import PaperRecord
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the "
+    "this to we with using via our their these those which".split()
+)
+
+# Title words say more about a paper than summary words
+TITLE_WEIGHT = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over titles, authors and summaries, one document per entry_id."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {doc number: weighted term frequency}
+        self.postings = defaultdict(dict)
+        self.doc_lengths = []
+        # doc number -> the paper without its summary, author names interned
+        self.docs = []
+        # doc number -> topics the paper is stored under
+        self.doc_topics = []
+        self.doc_numbers = {}
+        self.total_length = 0
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self._build_thread = None
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add_papers(self, topic: str, papers: Iterable[Dict]) -> int:
+        """Index papers stored under a topic; papers already indexed only gain the topic.
+
+        Returns:
+            Number of newly indexed papers
+        """
+        added = 0
+        with self.lock:
+            for paper in papers:
+                doc = self.doc_numbers.get(paper["entry_id"])
+                if doc is not None:
+                    topics = self.doc_topics[doc]
+                    if topic not in topics:
+                        topics.append(topic)
+                    continue
+
+                terms = Counter()
+                for term in tokenize(paper["title"]):
+                    terms[term] += TITLE_WEIGHT
+                terms.update(tokenize(" ".join(paper["authors"])))
+                terms.update(tokenize(paper["summary"]))
+
+                doc = len(self.docs)
+                self.docs.append(PaperRecord(paper["entry_id"], paper["title"], paper["authors"],
+                                             paper.get("published"), summary=""))
+                self.doc_topics.append([topic])
+                self.doc_numbers[paper["entry_id"]] = doc
+                length = sum(terms.values())
+                self.doc_lengths.append(length)
+                self.total_length += length
+                for term, tf in terms.items():
+                    self.postings[term][doc] = tf
+                added += 1
+        return added
+
+    def build(self, store) -> int:
+        """Index everything in a paper store, then mark the index ready."""
+        count = 0
+        try:
+            for topic in store.list_topics():
+                count += self.add_papers(topic, store.get_papers(topic))
+        finally:
+            self.ready.set()
+        return count
+
+    def start_build(self, store) -> None:
+        """Build the index in a background thread, once."""
+        with self.lock:
+            if self._build_thread is not None:
+                return
+            self._build_thread = threading.Thread(target=self.build, args=(store,), daemon=True)
+        self._build_thread.start()
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Rank indexed papers against a free-text query.
+
+        Returns:
+            Up to limit matches, best first
+        """
+        with self.lock:
+            n_docs = len(self.docs)
+            if not n_docs:
+                return []
+            avg_length = self.total_length / n_docs
+            k1, b = self.k1, self.b
+
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, tf in postings.items():
+                    norm = k1 * (1 - b + b * self.doc_lengths[doc] / avg_length)
+                    scores[doc] += idf * tf * (k1 + 1) / (tf + norm)
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [
+                {
+                    "entry_id": self.docs[doc].entry_id,
+                    "title": self.docs[doc].title,
+                    "authors": list(self.docs[doc].authors),
+                    "published": self.docs[doc].published,
+                    "topics": list(self.doc_topics[doc]),
+                    "score": round(score, 3)
+                }
+                for doc, score in best
+            ]
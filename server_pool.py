@@ -0,0 +1,474 @@
+"""
+Shared MCP server pool for the MCP Research Assistant
+Chat sessions lease long-lived server processes instead of spawning their own per browser tab.
+server_config.json entries with a "url" are network servers (streamable HTTP or SSE) that many
+chatbot processes can share; the pool keeps a few keep-alive sessions open to each and reconnects them.
+"""
+
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+from contextlib import suppress
+from tracing import propagated_env
+import asyncio
+import contextvars
+import json
+import os
+
+DEFAULT_HEALTH_INTERVAL = 30.0
+DEFAULT_HEALTH_TIMEOUT = 10.0
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_CONNECT_TIMEOUT = 30.0
+
+# Calls that are safe to send again on a fresh connection if the first attempt's connection broke
+RETRY_SAFE_METHODS = {"get_prompt", "read_resource", "list_tools", "list_prompts",
+                      "list_resources", "list_resource_templates"}
+
+
+# Set by ServerReplica._send around one call: the JSON-RPC ids of the requests it sends
+_sent_request_ids = contextvars.ContextVar("sent_request_ids", default=None)
+
+
+class RequestIdTap:
+    """A session's write stream that notes the id of every request sent from inside ServerReplica._send
+
+    The session sends from the calling task, so the ids land in that call's context.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def send(self, message):
+        ids = _sent_request_ids.get()
+        root = getattr(getattr(message, "message", None), "root", None)
+        if ids is not None and isinstance(root, types.JSONRPCRequest):
+            ids.append(root.id)
+        await self.stream.send(message)
+
+    async def __aenter__(self):
+        await self.stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self.stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def network_transport(url, transport="streamable-http", headers=None, timeout=DEFAULT_CONNECT_TIMEOUT):
+    """Return a factory opening one client connection to an MCP server at url"""
+    if transport in ("streamable-http", "http"):
+        return lambda: streamablehttp_client(url, headers=headers, timeout=timeout)
+    if transport == "sse":
+        return lambda: sse_client(url, headers=headers, timeout=timeout)
+    raise ValueError(f"Unknown MCP transport '{transport}' (use streamable-http or sse)")
+
+
+class ServerReplica:
+    """One MCP server process, or one connection to a network server, and its client session"""
+
+    def __init__(self, name, connect, multiplex=True):
+        self.name = name
+        # Opens the transport: yields (read, write, ...) streams
+        self.connect = connect
+        self.session = None
+        # Number of requests currently in flight, used for least-busy routing
+        self.busy = 0
+        # Servers that can't multiplex requests get one call at a time
+        self.lock = None if multiplex else asyncio.Lock()
+        self.task = None
+        self.ready = None
+        self.stopping = None
+        # Cancel notifications still being sent for abandoned requests
+        self.cancelling = set()
+
+    @property
+    def alive(self):
+        return self.session is not None and self.task is not None and not self.task.done()
+
+    async def start(self):
+        """Spawn the server and wait until its session is initialized"""
+        self.ready = asyncio.Event()
+        self.stopping = asyncio.Event()
+        # The transport and session contexts must be entered and exited by the
+        # same task, so each replica lives in its own long-running task
+        self.task = asyncio.create_task(self._run())
+        ready = asyncio.create_task(self.ready.wait())
+        await asyncio.wait({ready, self.task}, return_when=asyncio.FIRST_COMPLETED)
+        if not self.ready.is_set():
+            ready.cancel()
+            self.task.result()
+            raise RuntimeError(f"Server '{self.name}' exited during startup")
+
+    async def _run(self):
+        async with self.connect() as streams:
+            read, write = streams[0], RequestIdTap(streams[1])
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                self.session = session
+                self.ready.set()
+                try:
+                    await self.stopping.wait()
+                finally:
+                    self.session = None
+
+    async def request(self, method, *args, **kwargs):
+        """Call a ClientSession method on this replica"""
+        self.busy += 1
+        try:
+            if self.lock:
+                async with self.lock:
+                    return await self._send(method, *args, **kwargs)
+            return await self._send(method, *args, **kwargs)
+        finally:
+            self.busy -= 1
+
+    async def _send(self, method, *args, **kwargs):
+        session = self.session
+        request_ids = []
+        token = _sent_request_ids.set(request_ids)
+        try:
+            return await getattr(session, method)(*args, **kwargs)
+        except asyncio.CancelledError:
+            # Timed out or the chat went away: the SDK only stops waiting, so tell the
+            # server to stop working on it. Ids that already got an answer are ignored
+            if request_ids:
+                task = asyncio.create_task(self._notify_cancelled(session, request_ids))
+                self.cancelling.add(task)
+                task.add_done_callback(self.cancelling.discard)
+            raise
+        finally:
+            _sent_request_ids.reset(token)
+
+    async def _notify_cancelled(self, session, request_ids):
+        for request_id in request_ids:
+            notification = types.CancelledNotification(
+                params=types.CancelledNotificationParams(requestId=request_id, reason="Cancelled by the client")
+            )
+            with suppress(Exception):
+                await session.send_notification(types.ClientNotification(notification))
+
+    async def ping(self, timeout=DEFAULT_HEALTH_TIMEOUT):
+        """Return True if the server answers a ping in time"""
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception:
+            return False
+
+    async def stop(self, timeout=5.0):
+        """Shut the server down, killing it if it doesn't exit in time"""
+        if self.task is None:
+            return
+        self.stopping.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self.task), timeout)
+        except asyncio.TimeoutError:
+            self.task.cancel()
+            with suppress(BaseException):
+                await self.task
+        except Exception:
+            # A crashed server has nothing left to clean up
+            pass
+
+
+class ServerGroup:
+    """All replicas of one server_config.json entry, shared by every chat that leases it
+
+    Exposes the ClientSession methods the chatbot uses and routes each call to
+    the least busy live replica.
+    """
+
+    def __init__(self, name, config, health_interval=DEFAULT_HEALTH_INTERVAL):
+        config = dict(config)
+        self.name = name
+        self.url = config.pop("url", None)
+        # For network servers, "connections" is the number of pooled sessions to the one server
+        self.replica_count = max(1, int(config.pop("replicas", config.pop("connections", 1))))
+        self.multiplex = config.pop("multiplex", True)
+        if self.url:
+            self.connect = network_transport(
+                self.url,
+                transport=config.pop("transport", "streamable-http"),
+                headers=config.pop("headers", None),
+                timeout=float(config.pop("timeout", DEFAULT_CONNECT_TIMEOUT))
+            )
+        else:
+            if propagated_env():
+                # Servers trace to the same file/collector as the chatbot unless configured otherwise
+                config["env"] = {**propagated_env(), **(config.get("env") or {})}
+            params = StdioServerParameters(**config)
+            self.connect = lambda: stdio_client(params)
+        self.health_interval = health_interval
+        self.replicas = []
+        # Number of chat sessions currently holding a lease
+        self.refs = 0
+        self.start_lock = asyncio.Lock()
+        self.health_task = None
+        self.idle_task = None
+
+    def _new_replica(self):
+        return ServerReplica(self.name, self.connect, multiplex=self.multiplex)
+
+    async def ensure_started(self):
+        """Start any missing replicas and the health check loop"""
+        async with self.start_lock:
+            missing = [self._new_replica() for _ in range(self.replica_count - len(self.replicas))]
+            if missing:
+                results = await asyncio.gather(*(r.start() for r in missing), return_exceptions=True)
+                started = [r for r, result in zip(missing, results) if not isinstance(result, BaseException)]
+                self.replicas.extend(started)
+                if not self.replicas:
+                    raise results[0]
+            if self.health_task is None or self.health_task.done():
+                self.health_task = asyncio.create_task(self._health_loop())
+
+    async def check_health(self):
+        """Ping every replica and respawn the ones that are dead or unresponsive"""
+        async with self.start_lock:
+            healthy = await asyncio.gather(*(r.ping() for r in self.replicas))
+            for i, ok in enumerate(healthy):
+                if ok:
+                    continue
+                dead = self.replicas[i]
+                await dead.stop()
+                replacement = self._new_replica()
+                try:
+                    await replacement.start()
+                    self.replicas[i] = replacement
+                except Exception:
+                    # Keep the dead entry so the next check tries again
+                    pass
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            with suppress(Exception):
+                await self.check_health()
+
+    def pick(self):
+        """Choose the live replica with the fewest requests in flight"""
+        alive = [r for r in self.replicas if r.alive]
+        if not alive:
+            return None
+        return min(alive, key=lambda r: r.busy)
+
+    async def _pick_or_respawn(self):
+        replica = self.pick()
+        if replica is None:
+            # Every replica died since the last health check; respawn now
+            await self.check_health()
+            replica = self.pick()
+            if replica is None:
+                raise RuntimeError(f"Server '{self.name}' is not running")
+        return replica
+
+    async def request(self, method, *args, **kwargs):
+        replica = await self._pick_or_respawn()
+        try:
+            return await replica.request(method, *args, **kwargs)
+        except McpError:
+            # The server answered; the connection is fine
+            raise
+        except Exception:
+            # The connection may be broken (server restarted, network blip): reconnect
+            # now, and send the call again if repeating it is harmless
+            await self.check_health()
+            if method not in RETRY_SAFE_METHODS:
+                raise
+            replica = await self._pick_or_respawn()
+            return await replica.request(method, *args, **kwargs)
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        return await self.request("call_tool", name, arguments=arguments, **kwargs)
+
+    async def get_prompt(self, name, arguments=None):
+        return await self.request("get_prompt", name, arguments=arguments)
+
+    async def read_resource(self, uri):
+        return await self.request("read_resource", uri)
+
+    async def list_tools(self):
+        return await self.request("list_tools")
+
+    async def list_prompts(self):
+        return await self.request("list_prompts")
+
+    async def list_resources(self):
+        return await self.request("list_resources")
+
+    async def list_resource_templates(self):
+        return await self.request("list_resource_templates")
+
+    async def stop(self):
+        if self.health_task:
+            self.health_task.cancel()
+        await asyncio.gather(*(r.stop() for r in self.replicas))
+        self.replicas = []
+
+
+class ServerLease:
+    """A chat's lease on a pooled server group
+
+    The group is acquired in the background by start(), or lazily by the first
+    request, so servers a chat never uses are never spawned for it.
+    """
+
+    def __init__(self, pool, name, config, on_first_use=None):
+        self.pool = pool
+        self.name = name
+        self.config = config
+        self.on_first_use = on_first_use
+        self.used = False
+        self.acquiring = None
+
+    def start(self):
+        """Begin acquiring the server group in the background"""
+        if self.acquiring is None:
+            self.acquiring = asyncio.create_task(self.pool.acquire(self.name, self.config))
+        return self.acquiring
+
+    async def get(self):
+        """Wait for the server group, spawning it if nothing has yet"""
+        task = self.start()
+        try:
+            # Shielded so a timed-out tool call doesn't cancel a start others wait on
+            return await asyncio.shield(task)
+        except Exception:
+            if self.acquiring is task:
+                self.acquiring = None
+            raise
+
+    async def request(self, method, *args, **kwargs):
+        if not self.used:
+            self.used = True
+            if self.on_first_use:
+                self.on_first_use()
+        group = await self.get()
+        return await group.request(method, *args, **kwargs)
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        return await self.request("call_tool", name, arguments=arguments, **kwargs)
+
+    async def get_prompt(self, name, arguments=None):
+        return await self.request("get_prompt", name, arguments=arguments)
+
+    async def read_resource(self, uri):
+        return await self.request("read_resource", uri)
+
+    async def list_tools(self):
+        return await self.request("list_tools")
+
+    async def list_prompts(self):
+        return await self.request("list_prompts")
+
+    async def list_resources(self):
+        return await self.request("list_resources")
+
+    async def list_resource_templates(self):
+        return await self.request("list_resource_templates")
+
+    async def release(self):
+        """Give the lease back to the pool if it was ever acquired"""
+        task, self.acquiring = self.acquiring, None
+        if task is None:
+            return
+        try:
+            group = await task
+        except Exception:
+            return
+        await self.pool.release(group)
+
+
+class ServerPool:
+    """Process-wide pool of MCP servers, keyed by their server_config.json entry"""
+
+    def __init__(self, health_interval=DEFAULT_HEALTH_INTERVAL, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.health_interval = health_interval
+        # Servers stay up this long after their last lease is released, so a
+        # page refresh doesn't pay the cold start again
+        self.idle_timeout = idle_timeout
+        self.groups = {}
+
+    @staticmethod
+    def key(name, config):
+        return f"{name}:{json.dumps(config, sort_keys=True)}"
+
+    def lease(self, name, config, on_first_use=None):
+        """Create a lazy lease; nothing is spawned until it is started or used"""
+        return ServerLease(self, name, config, on_first_use=on_first_use)
+
+    def is_running(self, name, config):
+        group = self.groups.get(self.key(name, config))
+        return group is not None and any(r.alive for r in group.replicas)
+
+    async def acquire(self, name, config):
+        """Lease the servers for a config entry, starting or connecting them if needed"""
+        key = self.key(name, config)
+        group = self.groups.get(key)
+        if group is None:
+            group = ServerGroup(name, config, health_interval=self.health_interval)
+            self.groups[key] = group
+
+        group.refs += 1
+        if group.idle_task:
+            group.idle_task.cancel()
+            group.idle_task = None
+        try:
+            await group.ensure_started()
+        except Exception:
+            await self.release(group)
+            raise
+        return group
+
+    async def release(self, group):
+        """Give back a lease; idle servers shut down after idle_timeout"""
+        group.refs -= 1
+        if group.refs <= 0 and group.idle_task is None:
+            group.idle_task = asyncio.create_task(self._shutdown_when_idle(group))
+
+    async def _shutdown_when_idle(self, group):
+        await asyncio.sleep(self.idle_timeout)
+        if group.refs > 0:
+            return
+        for key, existing in list(self.groups.items()):
+            if existing is group:
+                del self.groups[key]
+        await group.stop()
+
+    def stats(self):
+        """Replica and lease counts per server"""
+        return {
+            group.name: {
+                "leases": group.refs,
+                "replicas": len(group.replicas),
+                "alive": sum(1 for r in group.replicas if r.alive),
+                "busy": [r.busy for r in group.replicas]
+            }
+            for group in self.groups.values()
+        }
+
+    async def close(self):
+        groups = list(self.groups.values())
+        self.groups = {}
+        await asyncio.gather(*(group.stop() for group in groups))
+
+
+# Process-wide pool shared by every chat session
+_shared_pool = None
+
+
+def get_server_pool():
+    """Return the shared server pool, creating it on first use"""
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = ServerPool(
+            health_interval=float(os.getenv("MCP_HEALTH_INTERVAL", DEFAULT_HEALTH_INTERVAL)),
+            idle_timeout=float(os.getenv("MCP_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT))
+        )
+    return _shared_pool
@@ -0,0 +1,327 @@
+"""
+Request tracing for the chatbot and the research server.
+
+A span times one step of a request (a process_query iteration, an LLM call,
+a tool call, a resource read, an arXiv fetch). Spans opened while another
+span is active become its children and share its trace ID, which doubles as
+the correlation ID sent to MCP servers with each tool call. Finished spans
+are written to the configured exporters (a JSON Lines file and/or an HTTP
+collector) and recorded in rolling per-name latency statistics.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+import uuid
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Span active in the current task or thread (asyncio tasks and to_thread copy it)
+current_span = contextvars.ContextVar("current_span", default=None)
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+HISTOGRAM_BARS = " ▁▂▃▄▅▆▇█"
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id() -> Optional[str]:
+    """Correlation ID of the request being handled, if any."""
+    span = current_span.get()
+    return span.trace_id if span else None
+
+
+class Span:
+    """One timed step of a request. Use as a context manager via Tracer.span()."""
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_id()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error = None
+        self.start_time = None
+        self.duration = None
+        self._started = None
+        self._token = None
+
+    def set(self, **attributes):
+        """Attach attributes, e.g. token counts known only once the step is done."""
+        self.attributes.update(attributes)
+
+    def fail(self, error: Any):
+        """Mark the span as failed without raising (for errors the caller handles)."""
+        self.error = str(error)
+
+    def propagation_meta(self) -> Dict[str, str]:
+        """Request metadata that lets an MCP server join this trace."""
+        return {"correlation_id": self.trace_id, "parent_span_id": self.span_id}
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self._token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        current_span.reset(self._token)
+        if exc is not None and self.error is None:
+            self.error = f"{exc_type.__name__}: {exc}" if str(exc) else exc_type.__name__
+        self.tracer.finish(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "service": self.tracer.service,
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class FileExporter:
+    """Appends finished spans to a JSON Lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Dict[str, Any]):
+        line = json.dumps(span, default=str) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def close(self):
+        pass
+
+
+class HttpExporter:
+    """POSTs finished spans in JSON batches ({"spans": [...]}) to a collector.
+
+    Spans are queued and sent from a background thread, so a slow or missing
+    collector never delays requests; when the queue is full spans are dropped.
+    """
+
+    def __init__(self, url: str, batch_size: int = 100, flush_interval: float = 2.0,
+                 max_queue: int = 10000, timeout: float = 5.0):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self.thread.start()
+
+    def export(self, span: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch = [span for span in batch if span is not None]
+                self._send(batch)
+                return
+            self._send(batch)
+
+    def _send(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"spans": batch}, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except Exception as e:
+            logger.warning("could not export %d spans to %s: %s", len(batch), self.url, e)
+
+    def close(self):
+        """Send whatever is queued and stop the background thread."""
+        self.queue.put(None)
+        self.thread.join(timeout=self.timeout)
+
+
+class LatencyStats:
+    """Rolling per-span-name latencies and errors over the last ``window`` seconds."""
+
+    def __init__(self, window: float = 300.0, max_samples: int = 10000):
+        self.window = window
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        # name -> (finished_at, duration, failed), oldest first
+        self.samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+
+    def record(self, name: str, duration: float, failed: bool):
+        with self.lock:
+            self.samples[name].append((time.monotonic(), duration, failed))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Count, error rate, percentiles and histogram of each span name within the window."""
+        cutoff = time.monotonic() - self.window
+        result = {}
+        with self.lock:
+            for name, samples in self.samples.items():
+                while samples and samples[0][0] < cutoff:
+                    samples.popleft()
+                if not samples:
+                    continue
+                durations = sorted(duration for _, duration, _ in samples)
+                errors = sum(1 for _, _, failed in samples if failed)
+                histogram = [0] * len(HISTOGRAM_BUCKETS_MS)
+                for duration in durations:
+                    ms = duration * 1000
+                    histogram[next(i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if ms <= bound)] += 1
+                result[name] = {
+                    "count": len(durations),
+                    "errors": errors,
+                    "error_rate": errors / len(durations),
+                    "p50_ms": _percentile(durations, 50) * 1000,
+                    "p90_ms": _percentile(durations, 90) * 1000,
+                    "p99_ms": _percentile(durations, 99) * 1000,
+                    "histogram": histogram
+                }
+        return result
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Tracer:
+    """Creates spans and hands finished ones to the exporters and the rolling stats."""
+
+    def __init__(self, service: str, exporters: Optional[List[Any]] = None, window: float = 300.0):
+        self.service = service
+        self.exporters = exporters or []
+        self.stats = LatencyStats(window=window)
+
+    def span(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+             **attributes) -> Span:
+        """Start a span, as a child of the current span unless trace_id is given.
+
+        Args:
+            name: Step being timed, e.g. "llm" or "tool"; stats are grouped by it
+            trace_id: Correlation ID to join (e.g. one received from a client)
+            parent_id: Span ID of the remote parent when joining a trace
+            **attributes: Extra fields recorded with the span
+        """
+        parent = current_span.get()
+        if trace_id is None:
+            if parent is not None:
+                trace_id, parent_id = parent.trace_id, parent.span_id
+            else:
+                trace_id = new_id()
+        return Span(self, name, trace_id, parent_id, attributes)
+
+    def finish(self, span: Span):
+        self.stats.record(span.name, span.duration, span.error is not None)
+        if not self.exporters:
+            return
+        data = span.to_dict()
+        for exporter in self.exporters:
+            try:
+                exporter.export(data)
+            except Exception as e:
+                logger.warning("trace exporter %s failed: %s", type(exporter).__name__, e)
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
+
+
+def format_stats(snapshot: Dict[str, Dict[str, Any]], window: float) -> str:
+    """Render a stats snapshot as a markdown table with one histogram sparkline per row."""
+    if not snapshot:
+        return f"No requests traced in the last {window:g} seconds."
+    lines = [
+        f"**Latency over the last {window:g}s** (histogram buckets: "
+        + ", ".join(f"≤{bound:g}ms" for bound in HISTOGRAM_BUCKETS_MS[:-1]) + ", more)\n",
+        "| Step | Count | Errors | p50 (ms) | p90 (ms) | p99 (ms) | Histogram |",
+        "|---|---:|---:|---:|---:|---:|---|"
+    ]
+    for name in sorted(snapshot):
+        stats = snapshot[name]
+        peak = max(stats["histogram"])
+        bars = "".join(
+            HISTOGRAM_BARS[0 if not n else max(1, round(n / peak * (len(HISTOGRAM_BARS) - 1)))]
+            for n in stats["histogram"]
+        )
+        lines.append(
+            f"| {name} | {stats['count']} | {stats['errors']} ({stats['error_rate']:.0%}) | "
+            f"{stats['p50_ms']:.0f} | {stats['p90_ms']:.0f} | {stats['p99_ms']:.0f} | `{bars}` |"
+        )
+    return "\n".join(lines)
+
+
+# Settings passed on to MCP servers the chatbot spawns, so their spans land in the same place
+PROPAGATED_ENV = ("TRACE_FILE", "TRACE_COLLECTOR_URL", "TRACE_STATS_WINDOW")
+
+
+def propagated_env() -> Dict[str, str]:
+    """Tracing settings of this process to hand to child server processes."""
+    return {name: os.environ[name] for name in PROPAGATED_ENV if os.getenv(name)}
+
+
+_tracer = None
+
+
+def get_tracer(service: Optional[str] = None) -> Tracer:
+    """Process-wide tracer configured from the environment.
+
+    TRACE_FILE: append spans to this JSON Lines file
+    TRACE_COLLECTOR_URL: POST span batches to this URL
+    TRACE_STATS_WINDOW: seconds of history kept for /stats (default 300)
+    """
+    global _tracer
+    if _tracer is None:
+        exporters = []
+        if os.getenv("TRACE_FILE"):
+            exporters.append(FileExporter(os.getenv("TRACE_FILE")))
+        if os.getenv("TRACE_COLLECTOR_URL"):
+            exporters.append(HttpExporter(os.getenv("TRACE_COLLECTOR_URL")))
+        _tracer = Tracer(
+            service=service or os.getenv("TRACE_SERVICE", "mcp_chatbot"),
+            exporters=exporters,
+            window=float(os.getenv("TRACE_STATS_WINDOW", "300"))
+        )
+    return _tracer